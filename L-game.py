@@ -1,345 +1,14 @@
+import os
 import pygame
-import random
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+from lgame import Bitboard, DEFAULT_STATE, GameState, MinimaxAgent, generate_l_shape, parse_game_state
+from lgame.book import DEFAULT_PATH as BOOK_PATH
+from lgame.history import DRAW_REPETITIONS, GameHistory
 
-class GameState:
-    def __init__(self, player_positions, dot_positions, current_player):
-        self.player_positions = player_positions
-        self.dot_positions = dot_positions
-        self.current_player = current_player
 
-    def getNumAgents(self):
-        return 2
-
-    
-
-    def generateSuccessor(self, agentIndex, move):
-        x, y, orientation = move
-        player = "player1" if agentIndex == 0 else "player2"
-        
-        new_positions = generate_l_shape(x, y, orientation)
-        new_player_positions = dict(self.player_positions)
-        new_player_positions[player] = new_positions
-        
-        return GameState(new_player_positions, self.dot_positions, 
-                        "player2" if self.current_player == "player1" else "player1")
-
-    def isWin(self):
-        opponent = "player2" if self.current_player == "player1" else "player1"
-        opponent_index = 1 if opponent == "player2" else 0
-        l_piece_moves = self.getLegalMoves(opponent_index)
-        return len(l_piece_moves) == 0
-
-    def isLose(self):
-        current_index = 0 if self.current_player == "player1" else 1
-        l_piece_moves = self.getLegalMoves(current_index)
-        return len(l_piece_moves) == 0
-
-    def getLegalMoves(self, agentIndex):
-        player = "player1" if agentIndex == 0 else "player2"
-        other_player = "player2" if player == "player1" else "player1"
-        
-        legal_moves = []
-        current_positions = set(self.player_positions[player])
-        
-        for x in range(1, 5):
-            for y in range(1, 5):
-                for orientation in ['N', 'S', 'E', 'W']:
-                    try:
-                        new_positions = generate_l_shape(x, y, orientation)
-                        new_positions_set = set(new_positions)
-                        
-                        if new_positions_set == current_positions:
-                            continue
-                            
-                        if not all(1 <= pos[0] <= 4 and 1 <= pos[1] <= 4 for pos in new_positions):
-                            continue
-                            
-                        valid = True
-                        occupied_positions = (set(self.player_positions[other_player]) | 
-                                        set(self.dot_positions))
-                        
-                        for pos in new_positions:
-                            if pos in occupied_positions:
-                                valid = False
-                                break
-                                
-                        if valid:
-                            legal_moves.append((x, y, orientation))
-                            
-                    except ValueError:
-                        continue
-        
-        return legal_moves
-    
-    
-    
-class MinimaxAgent:
-    def __init__(self, depth='inf'):
-        self.depth = float('inf') if depth == 'inf' else int(depth)
-        self.nodes_expanded = 0
-        self.cache = {}
-
-    def getAction(self, gameState):
-        """
-        Returns the minimax action using alpha-beta pruning
-        """
-        self.nodes_expanded = 0
-        
-        def alphabeta(state, depth, alpha, beta, maximizingPlayer, moves_made=0):
-            state_key = (
-                str(state.player_positions),
-                str(state.dot_positions),
-                depth,
-                maximizingPlayer
-            )
-            
-            if state_key in self.cache:
-                return self.cache[state_key]
-            
-            self.nodes_expanded += 1
-            
-            if depth == 0 or state.isWin() or state.isLose() or moves_made >= 50:
-                score = self.evaluationFunction(state)
-                self.cache[state_key] = (score, None)
-                return score, None
-            
-            valid_moves = self.getLegalMovesWithNeutral(state)
-            if not valid_moves:
-                score = self.evaluationFunction(state)
-                self.cache[state_key] = (score, None)
-                return score, None
-            
-            best_move = None
-            if maximizingPlayer:
-                value = float('-inf')
-                for l_move, neutral_move in valid_moves:
-                    combined_move = (l_move[0], l_move[1], l_move[2], neutral_move)
-                    successor = self.getSuccessor(state, combined_move)
-                    if successor:  # Only process if the move was valid
-                        new_score, _ = alphabeta(successor, depth - 1, alpha, beta, False, moves_made + 1)
-                        if new_score > value:
-                            value = new_score
-                            best_move = combined_move
-                        alpha = max(alpha, value)
-                        if beta <= alpha:
-                            break
-            else:
-                value = float('inf')
-                for l_move, neutral_move in valid_moves:
-                    combined_move = (l_move[0], l_move[1], l_move[2], neutral_move)
-                    successor = self.getSuccessor(state, combined_move)
-                    if successor:  # Only process if the move was valid
-                        new_score, _ = alphabeta(successor, depth - 1, alpha, beta, True, moves_made + 1)
-                        if new_score < value:
-                            value = new_score
-                            best_move = combined_move
-                        beta = min(beta, value)
-                        if beta <= alpha:
-                            break
-                        
-            self.cache[state_key] = (value, best_move)
-            return value, best_move
-
-        valid_moves = self.getLegalMovesWithNeutral(gameState)
-        if not valid_moves:
-            return None
-            
-        _, action = alphabeta(gameState, self.depth, float('-inf'), float('inf'), True)
-        print(f"Nodes expanded: {self.nodes_expanded}")
-        
-        if action:
-            return action
-            
-        # Fallback to any valid move if alphabeta fails
-        l_move, neutral_move = valid_moves[0]
-        return (l_move[0], l_move[1], l_move[2], neutral_move)
-    
-
-    def getSuccessor(self, state, move):
-        """
-        Gets the successor state after applying a combined move
-        """
-        x, y, orientation, neutral_move = move
-        if neutral_move is None:
-            return None
-            
-        # Verify L piece move
-        new_l_positions = generate_l_shape(x, y, orientation)
-        other_player = "player2" if state.current_player == "player1" else "player1"
-        
-        # Check for collisions
-        other_pieces = set(state.player_positions[other_player])
-        dots = set(state.dot_positions)
-        
-        # Validate L piece positions
-        for pos in new_l_positions:
-            if not (1 <= pos[0] <= 4 and 1 <= pos[1] <= 4):
-                return None
-            if pos in other_pieces or pos in dots:
-                return None
-                
-        # Validate neutral piece movement
-        old_pos, new_pos = neutral_move
-        if old_pos not in state.dot_positions:
-            return None
-            
-        if not (1 <= new_pos[0] <= 4 and 1 <= new_pos[1] <= 4):
-            return None
-            
-        if (new_pos in new_l_positions or 
-            new_pos in state.player_positions[other_player] or 
-            new_pos in state.dot_positions):
-            return None
-        
-        # All validations passed, create new state
-        new_player_positions = dict(state.player_positions)
-        new_player_positions[state.current_player] = new_l_positions
-        new_dot_positions = list(state.dot_positions)
-        
-        # Apply neutral piece movement
-        new_dot_positions.remove(old_pos)
-        new_dot_positions.append(new_pos)
-            
-        return GameState(new_player_positions, new_dot_positions, 
-                        "player2" if state.current_player == "player1" else "player1")
-
-    def coversNewSquare(self, old_positions, new_positions):
-        """
-        Check if the new L-piece position covers at least one square
-        that wasn't covered by the old position
-        """
-        old_set = set(old_positions)
-        new_set = set(new_positions)
-        return bool(new_set - old_set)  # Returns True if there are any new squares
-
-    def getLegalMovesWithNeutral(self, state):
-        """
-        Gets all legal moves with mandatory neutral piece movement and new square coverage
-        """
-        combined_moves = []
-        current_player = state.current_player
-        other_player = "player2" if current_player == "player1" else "player1"
-        
-        # Get all pieces' current positions as sets for efficient collision checking
-        current_l_positions = set(state.player_positions[current_player])
-        other_pieces = set(state.player_positions[other_player])
-        dot_positions = set(state.dot_positions)
-        
-        # Try all possible L-piece positions
-        for x in range(1, 5):
-            for y in range(1, 5):
-                for orientation in ['N', 'S', 'E', 'W']:
-                    try:
-                        # Generate new L-piece positions
-                        new_l_positions = generate_l_shape(x, y, orientation)
-                        new_positions_set = set(new_l_positions)
-                        
-                        # Skip if no new squares are covered
-                        if not bool(new_positions_set - current_l_positions):
-                            continue
-                            
-                        # Check if all positions are within bounds
-                        if not all(1 <= pos[0] <= 4 and 1 <= pos[1] <= 4 for pos in new_l_positions):
-                            continue
-                            
-                        # Check for collisions with other pieces
-                        if (new_positions_set & other_pieces) or (new_positions_set & dot_positions):
-                            continue
-                        
-                        # For valid L-piece positions, try all possible neutral piece movements
-                        for dot_pos in state.dot_positions:
-                            for new_x in range(1, 5):
-                                for new_y in range(1, 5):
-                                    new_dot_pos = (new_x, new_y)
-                                    
-                                    # Skip if neutral piece doesn't actually move
-                                    if new_dot_pos == dot_pos:
-                                        continue
-                                    
-                                    # Skip if new position is out of bounds
-                                    if not (1 <= new_x <= 4 and 1 <= new_y <= 4):
-                                        continue
-                                    
-                                    # Skip if new position overlaps with any piece
-                                    if (new_dot_pos in new_positions_set or
-                                        new_dot_pos in other_pieces or
-                                        new_dot_pos in (set(state.dot_positions) - {dot_pos})):
-                                        continue
-                                    
-                                    # Move is valid - add it to the list
-                                    l_move = (x, y, orientation)
-                                    neutral_move = (dot_pos, new_dot_pos)
-                                    combined_moves.append((l_move, neutral_move))
-                                    
-                    except ValueError:
-                        continue
-        
-        # Shuffle moves for variety
-        random.shuffle(combined_moves)
-        return combined_moves
-
-    def isValidNeutralMove(self, state, old_pos, new_pos, new_l_positions):
-        """
-        Checks if a neutral piece movement is valid with the given L-piece positions
-        """
-        # Must be within bounds
-        if not (1 <= new_pos[0] <= 4 and 1 <= new_pos[1] <= 4):
-            return False
-            
-        # Can't overlap with other pieces
-        if (new_pos in new_l_positions or 
-            new_pos in state.player_positions["player1"] or 
-            new_pos in state.dot_positions or 
-            new_pos == old_pos):
-            return False
-            
-        return True
-
-
-    def evaluationFunction(self, state):
-        """
-        Heuristic evaluation function
-        """
-        if state.isWin():
-            return float('inf')
-        if state.isLose():
-            return float('-inf')
-            
-        score = 0
-        
-        # Mobility score
-        player2_moves = len(self.getLegalMovesWithNeutral(state))
-        # Approximate player1's moves since we don't need exact neutral moves calculation
-        player1_moves = len(state.getLegalMoves(0)) 
-        mobility_score = player2_moves - player1_moves
-        score += mobility_score * 10
-        
-        # Territory control for L-piece
-        player2_positions = set(state.player_positions["player2"])
-        for pos in player2_positions:
-            x, y = pos
-            if 2 <= x <= 3 and 2 <= y <= 3:  # Center positions
-                score += 2
-            else:  # Edge positions
-                score += 1
-        
-        # Neutral piece positioning
-        for dot_pos in state.dot_positions:
-            x, y = dot_pos
-            if 2 <= x <= 3 and 2 <= y <= 3:  # Center positions
-                score += 1
-            # Bonus for blocking opponent's potential moves
-            adj_squares = [(x+1,y), (x-1,y), (x,y+1), (x,y-1)]
-            for adj_x, adj_y in adj_squares:
-                if (1 <= adj_x <= 4 and 1 <= adj_y <= 4 and 
-                    (adj_x, adj_y) in state.player_positions["player1"]):
-                    score += 2
-        
-        return score
-    
-    
 class LGame:
     def __init__(self):
         pygame.init()
@@ -359,48 +28,54 @@ class LGame:
         self.yellow = (255, 255, 0)
 
         self.font = pygame.font.Font(None, 48)
+        self.clock = pygame.time.Clock()
+        self.search = BackgroundSearch()
+        self.text_cache = {}
+        self.board_background = None
+        # Content of each screen region as last drawn; empty forces a full redraw
+        self.drawn_regions = {}
         self.reset_game()
 
     def initialize_game_state(self):
-        default_state = "3 1 W 1 1 4 4 2 4 E"
         input_text = ""
         
         while True:
             self.screen.fill(self.black)
             
             # Display instructions
-            title = self.font.render("Enter Initial Game State", True, self.white)
+            title = self.render_text("Enter Initial Game State", self.white)
             title_rect = title.get_rect(center=(self.screen_width // 2, 100))
             self.screen.blit(title, title_rect)
             
             # Display format instructions
             format_text = "Format: P1(x y D) n1x n1y n2x n2y P2(x y D)"
-            format_surface = self.font.render(format_text, True, self.gray)
+            format_surface = self.render_text(format_text, self.gray)
             format_rect = format_surface.get_rect(center=(self.screen_width // 2, 150))
             self.screen.blit(format_surface, format_rect)
             
             # Display example
             example = "Example: 3 1 W 1 1 4 4 2 4 E"
-            example_surface = self.font.render(example, True, self.gray)
+            example_surface = self.render_text(example, self.gray)
             example_rect = example_surface.get_rect(center=(self.screen_width // 2, 180))
             self.screen.blit(example_surface, example_rect)
             
             # Display enter instruction
             enter_text = "Press ENTER for default state"
-            enter_surface = self.font.render(enter_text, True, self.green)
+            enter_surface = self.render_text(enter_text, self.green)
             enter_rect = enter_surface.get_rect(center=(self.screen_width // 2, 220))
             self.screen.blit(enter_surface, enter_rect)
 
             # Display current input
-            input_prompt = self.font.render("Your input:", True, self.white)
+            input_prompt = self.render_text("Your input:", self.white)
             input_prompt_rect = input_prompt.get_rect(center=(self.screen_width // 2, 320))
             self.screen.blit(input_prompt, input_prompt_rect)
 
-            input_surface = self.font.render(input_text, True, self.green)
+            input_surface = self.render_text(input_text, self.green)
             input_rect = input_surface.get_rect(center=(self.screen_width // 2, 350))
             self.screen.blit(input_surface, input_rect)
 
             pygame.display.flip()
+            self.clock.tick(30)
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -413,40 +88,19 @@ class LGame:
                     elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
                         try:
                             # Use default state if input is empty
-                            state_to_use = input_text.strip() if input_text.strip() else default_state
-                            tokens = state_to_use.split()
-                            
-                            if len(tokens) != 10:
-                                raise ValueError("Invalid input format. Must provide exactly 10 values.")
-
-                            p1_row, p1_col = int(tokens[0]), int(tokens[1])
-                            p1_orientation = tokens[2].upper()
-                            player1_positions = generate_l_shape(p1_row, p1_col, p1_orientation)
-
-                            neutral_1 = (int(tokens[3]), int(tokens[4]))
-                            neutral_2 = (int(tokens[5]), int(tokens[6]))
-
-                            p2_row, p2_col = int(tokens[7]), int(tokens[8])
-                            p2_orientation = tokens[9].upper()
-                            player2_positions = generate_l_shape(p2_row, p2_col, p2_orientation)
-
-                            all_positions = set(player1_positions + player2_positions + [neutral_1, neutral_2])
-                            if len(all_positions) != 10:
-                                raise ValueError("Pieces overlap or are invalid.")
+                            state_to_use = input_text.strip() if input_text.strip() else DEFAULT_STATE
+                            initial_state = parse_game_state(state_to_use)
 
-                            self.player_positions = {
-                                "player1": player1_positions,
-                                "player2": player2_positions
-                            }
-                            self.dot_positions = [neutral_1, neutral_2]
+                            self.player_positions = initial_state.player_positions
+                            self.dot_positions = initial_state.dot_positions
                             self.current_player = "player1"
-                            self.past_moves = pastMoves()
+                            self.history = GameHistory()
                             return
                             
                         except (ValueError, IndexError) as e:
                             # Display error message
                             error_text = f"Error: {str(e)}"
-                            error_surface = self.font.render(error_text, True, self.red)
+                            error_surface = self.render_text(error_text, self.red)
                             error_rect = error_surface.get_rect(center=(self.screen_width // 2, 400))
                             self.screen.blit(error_surface, error_rect)
                             pygame.display.flip()
@@ -462,12 +116,16 @@ class LGame:
         """Reset all game variables to their initial state"""
         self.input_text = ""
         self.game_mode = None
-        self.ai_agent = MinimaxAgent(depth=3)
-        self.past_moves = pastMoves()
+        self.ai_agent = self.new_agent(3)
+        self.history = GameHistory()
         self.game_over = False
         self.winner_message = ""
         self.initialize_game_state()
         
+    def new_agent(self, depth):
+        """AI player that opens from the opening book when one has been built"""
+        return MinimaxAgent(depth=depth, book=BOOK_PATH if os.path.exists(BOOK_PATH) else None)
+
     def display_play_again(self):
         """Display play again options and handle input through Pygame"""
         input_text = ""
@@ -476,21 +134,22 @@ class LGame:
             self.screen.fill(self.black)
             
             # Display winner message
-            winner_surface = self.font.render(self.winner_message, True, self.yellow)
+            winner_surface = self.render_text(self.winner_message, self.yellow)
             winner_rect = winner_surface.get_rect(center=(self.screen_width // 2, 180))
             self.screen.blit(winner_surface, winner_rect)
             
             # Display play again prompt
-            play_again = self.font.render("Play Again? (Y/N)", True, self.white)
+            play_again = self.render_text("Play Again? (Y/N)", self.white)
             play_rect = play_again.get_rect(center=(self.screen_width // 2, 250))
             self.screen.blit(play_again, play_rect)
             
             # Display current input
-            input_surface = self.font.render(input_text, True, self.green)
+            input_surface = self.render_text(input_text, self.green)
             input_rect = input_surface.get_rect(center=(self.screen_width // 2, 300))
             self.screen.blit(input_surface, input_rect)
             
             pygame.display.flip()
+            self.clock.tick(30)
 
             # Handle events
             for event in pygame.event.get():
@@ -523,10 +182,10 @@ class LGame:
             self.screen.fill(self.black)
             
             # Create text surfaces
-            title = self.font.render("Select Game Mode:", True, self.white)
-            option1 = self.font.render("1. Human vs Human", True, self.white)
-            option2 = self.font.render("2. Human vs AI", True, self.white)
-            option3 = self.font.render("3. AI vs AI", True, self.white)
+            title = self.render_text("Select Game Mode:", self.white)
+            option1 = self.render_text("1. Human vs Human", self.white)
+            option2 = self.render_text("2. Human vs AI", self.white)
+            option3 = self.render_text("3. AI vs AI", self.white)
             
             # Get rectangles for centering
             title_rect = title.get_rect(center=(self.screen_width // 2, self.screen_height // 3))
@@ -541,6 +200,7 @@ class LGame:
             self.screen.blit(option3, option3_rect)
             
             pygame.display.flip()
+            self.clock.tick(30)
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -559,8 +219,8 @@ class LGame:
                     elif event.key == pygame.K_3:
                         self.game_mode = "ai_vs_ai"
                         # Create two different AI agents with different depths for variety
-                        self.ai_agent1 = MinimaxAgent(depth=3)  # AI player 1
-                        self.ai_agent2 = MinimaxAgent(depth=2)  # AI player 2
+                        self.ai_agent1 = self.new_agent(3)  # AI player 1
+                        self.ai_agent2 = self.new_agent(2)  # AI player 2
                         return True
         return True
     
@@ -571,22 +231,22 @@ class LGame:
             self.screen.fill(self.black)
             
             # Display mode title
-            title = self.font.render(mode_title, True, self.white)
+            title = self.render_text(mode_title, self.white)
             title_rect = title.get_rect(center=(self.screen_width // 2, self.screen_height // 3))
             self.screen.blit(title, title_rect)
             
             # Display selection prompt
-            prompt = self.font.render("Who goes first?", True, self.white)
+            prompt = self.render_text("Who goes first?", self.white)
             prompt_rect = prompt.get_rect(center=(self.screen_width // 2, self.screen_height // 2))
             self.screen.blit(prompt, prompt_rect)
             
             # Display options
             if self.game_mode == "human":
-                option1 = self.font.render("1. Player 1", True, self.white)
-                option2 = self.font.render("2. Player 2", True, self.white)
+                option1 = self.render_text("1. Player 1", self.white)
+                option2 = self.render_text("2. Player 2", self.white)
             else:  # human vs AI
-                option1 = self.font.render("1. Human", True, self.white)
-                option2 = self.font.render("2. AI", True, self.white)
+                option1 = self.render_text("1. Human", self.white)
+                option2 = self.render_text("2. AI", self.white)
                 
             option1_rect = option1.get_rect(center=(self.screen_width // 2, (self.screen_height // 2) + 80))
             option2_rect = option2.get_rect(center=(self.screen_width // 2, (self.screen_height // 2) + 160))
@@ -595,6 +255,7 @@ class LGame:
             self.screen.blit(option2, option2_rect)
             
             pygame.display.flip()
+            self.clock.tick(30)
             
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -606,7 +267,7 @@ class LGame:
                     elif event.key == pygame.K_2:
                         self.current_player = "player2"
                         if self.game_mode == "ai":
-                            self.ai_agent = MinimaxAgent(depth=3)  # Create AI agent here if AI goes first
+                            self.ai_agent = self.new_agent(3)  # Create AI agent here if AI goes first
                         return True
 
 
@@ -621,9 +282,12 @@ class LGame:
 
             # Main game loop
             game_running = True
+            self.last_move_ticks = pygame.time.get_ticks()
+            self.drawn_regions = {}
             while game_running and running:
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
+                        self.search.cancel()
                         running = False
                         game_running = False
                     
@@ -632,6 +296,7 @@ class LGame:
                         
                         # Handle undo command
                         if command_parts[0] == "undo":
+                            self.search.cancel()
                             if len(command_parts) == 2 and command_parts[1].isdigit():
                                 self.undo_last_move(int(command_parts[1]))
                             else:
@@ -639,9 +304,25 @@ class LGame:
                             self.input_text = ""
                             continue
 
+                        if command_parts[0] == "redo":
+                            self.search.cancel()
+                            if len(command_parts) == 2 and command_parts[1].isdigit():
+                                self.redo_move(int(command_parts[1]))
+                            else:
+                                self.redo_move(1)
+                            self.input_text = ""
+                            continue
+
+                        # The AI's own move is still being searched
+                        if self.game_mode == "ai" and self.current_player == "player2":
+                            self.input_text = ""
+                            continue
+
                         # Handle regular moves
                         try:
                             move = self.parse_input(self.input_text)
+                            # Stop pondering; the AI searches the real position next
+                            self.search.cancel()
                             if self.update_game_state(self.current_player, move):
                                 new_state = GameState(self.player_positions, self.dot_positions, self.current_player)
                                 opponent_index = 1 if self.current_player == "player1" else 0
@@ -654,6 +335,8 @@ class LGame:
                                     else:
                                         self.winner_message = f"{winner} WINS!"
                                     self.game_over = True
+                                else:
+                                    self.check_repetition_draw()
                                 
                                 if not self.game_over:
                                     self.current_player = "player2" if self.current_player == "player1" else "player1"
@@ -662,69 +345,70 @@ class LGame:
                         except ValueError as e:
                             self.input_text = ""
 
-                # Handle AI moves
+                # Handle AI moves without blocking the window
                 if not self.game_over:
-                    if self.game_mode == "ai_vs_ai":
-                        # Add delay between AI moves for visibility
-                        pygame.time.wait(1000)  
-                        
-                        game_state = GameState(self.player_positions, self.dot_positions, self.current_player)
-                        
-                        # Determine which AI agent to use
-                        current_agent = self.ai_agent1 if self.current_player == "player1" else self.ai_agent2
-                        ai_move = current_agent.getAction(game_state)
-                        
-                        if ai_move:
-                            print(f"AI {self.current_player} attempting move:", ai_move)
-                            success = self.update_game_state(self.current_player, ai_move)
-                            if success:
-                                print(f"AI {self.current_player} move successful")
-                                new_state = GameState(self.player_positions, self.dot_positions, self.current_player)
-                                opponent_index = 1 if self.current_player == "player1" else 0
-                                legal_moves = new_state.getLegalMoves(opponent_index)
-                                
-                                if len(legal_moves) <= 1:
-                                    winner = "AI 1" if self.current_player == "player1" else "AI 2"
-                                    self.winner_message = f"{winner} WINS!"
-                                    print(f"\n!!! GAME OVER - {self.winner_message}")
-                                    self.game_over = True
-                                else:
-                                    self.current_player = "player2" if self.current_player == "player1" else "player1"
-                            else:
-                                print(f"AI {self.current_player} move failed")
-                                
-                    elif self.game_mode == "ai" and self.current_player == "player2":
-                        game_state = GameState(self.player_positions, self.dot_positions, self.current_player)
-                        ai_move = self.ai_agent.getAction(game_state)
-                        
-                        if ai_move:
-                            print("AI attempting move:", ai_move)
-                            success = self.update_game_state("player2", ai_move)
-                            if success:
-                                print("AI move successful")
-                                new_state = GameState(self.player_positions, self.dot_positions, "player2")
-                                legal_moves = new_state.getLegalMoves(0)  # Check player1's moves
-                                if len(legal_moves) <= 1:
-                                    self.winner_message = "AI WINS!"
-                                    print(f"\n!!! GAME OVER - {self.winner_message}")
-                                    self.game_over = True
-                                else:
-                                    self.current_player = "player1"
+                    if self.game_mode == "ai_vs_ai" or (self.game_mode == "ai" and self.current_player == "player2"):
+                        if self.search.kind == "move":
+                            done, ai_move = self.search.poll()
+                            if done:
+                                self.apply_ai_move(ai_move)
+                                self.last_move_ticks = pygame.time.get_ticks()
+                        # Keep a delay between AI vs AI moves for visibility
+                        elif self.game_mode == "ai" or pygame.time.get_ticks() - self.last_move_ticks >= 1000:
+                            if self.game_mode == "ai":
+                                current_agent = self.ai_agent
                             else:
-                                print("AI move failed")
+                                current_agent = self.ai_agent1 if self.current_player == "player1" else self.ai_agent2
+                            self.search.start("move", current_agent.getAction, self.snapshot_state())
+
+                    elif self.game_mode == "ai" and self.search.kind is None:
+                        # Think on the human's time about the replies we are likely to face
+                        self.search.start("ponder", self.ai_agent.ponder, self.snapshot_state())
 
                 # Update the display
                 self.update_display()
+                self.clock.tick(30)
 
                 # If game is over, show play again option
                 if self.game_over:
+                    self.search.cancel()
                     if self.display_play_again():
                         game_running = False  # Exit current game loop to start new game
                     else:
                         running = False  # Exit main loop to quit game
                         game_running = False
 
+        self.search.shutdown()
         pygame.quit()
+
+    def snapshot_state(self):
+        """Copy of the current position that a background search can own"""
+        return GameState(dict(self.player_positions), list(self.dot_positions), self.current_player,
+                         tuple(self.history.path()[:-1]))
+
+    def apply_ai_move(self, ai_move):
+        """Plays the move a finished AI search returned for the current player"""
+        if not ai_move:
+            return
+        name = "AI" if self.game_mode == "ai" else f"AI {self.current_player}"
+        print(f"{name} attempting move:", ai_move)
+        if not self.update_game_state(self.current_player, ai_move):
+            print(f"{name} move failed")
+            return
+        print(f"{name} move successful")
+        new_state = GameState(self.player_positions, self.dot_positions, self.current_player)
+        opponent_index = 1 if self.current_player == "player1" else 0
+        legal_moves = new_state.getLegalMoves(opponent_index)
+        if len(legal_moves) <= 1:
+            if self.game_mode == "ai":
+                self.winner_message = "AI WINS!"
+            else:
+                winner = "AI 1" if self.current_player == "player1" else "AI 2"
+                self.winner_message = f"{winner} WINS!"
+            print(f"\n!!! GAME OVER - {self.winner_message}")
+            self.game_over = True
+        elif not self.check_repetition_draw():
+            self.current_player = "player2" if self.current_player == "player1" else "player1"
         
         
         
@@ -733,18 +417,54 @@ class LGame:
         if amount <= 0:
             print("Invalid undo amount!")
             return
-        if self.past_moves.size() == 0:
+        start_ply = self.history.ply()
+        key = self.history.undo(amount)
+        if key is None:
             print("No moves to undo!")
             return
+        # Against the AI, stop on the human's turn; the AI would otherwise reply
+        # at once and its move would drop the moves left to redo. Once the cap has
+        # trimmed the history the oldest position kept may be the AI's turn; then
+        # go forward to the human's instead
+        if self.game_mode == "ai" and Bitboard.from_key(key).side == 1:
+            key = self.history.undo(1) or self.history.redo(1)
+            if self.history.ply() == start_ply:
+                print("No moves to undo!")
+                return
+        self.restore_position(key)
+        print("Undo successful. Restored state from %d move(s)." % (start_ply - self.history.ply()))
+
+    def redo_move(self, amount=1):
+        if amount <= 0:
+            print("Invalid redo amount!")
+            return
+        start_ply = self.history.ply()
+        key = self.history.redo(amount)
+        if key is None:
+            print("No moves to redo!")
+            return
+        # Replay the AI's recorded answer too rather than have it search again
+        if self.game_mode == "ai" and Bitboard.from_key(key).side == 1:
+            key = self.history.redo(1) or key
+        self.restore_position(key)
+        print("Redo successful. Replayed %d move(s)." % (self.history.ply() - start_ply))
+
+    def check_repetition_draw(self):
+        """Ends the game as a draw once the position has occurred DRAW_REPETITIONS times"""
+        if self.history.repetitions() < DRAW_REPETITIONS:
+            return False
+        self.winner_message = "DRAW BY REPETITION"
+        print(f"\n!!! GAME OVER - {self.winner_message}")
+        self.game_over = True
+        return True
 
-        saved_state = self.past_moves.goBack(amount)
-        if saved_state:
-            self.player_positions = saved_state["player_positions"]
-            self.dot_positions = saved_state["dot_positions"]
-            self.current_player = saved_state["current_player"]
-            print("Undo successful. Restored state from %d move(s)." % amount)
-        else:
-            print("No more moves available to go back to!")
+    def position_key(self, player):
+        """Packed key of the board with player to move"""
+        return GameState(self.player_positions, self.dot_positions, player).toBitboard().key()
+
+    def restore_position(self, key):
+        """Makes a position from the history the current one"""
+        self.player_positions, self.dot_positions, self.current_player = Bitboard.from_key(key).to_positions()
 
     def handle_input(self, event):
         if event.type == pygame.KEYDOWN:
@@ -830,12 +550,9 @@ class LGame:
                     print("Invalid neutral piece destination - overlaps with other neutral piece")
                     return False
             
-            # At this point, both moves are valid, so save current state and apply changes
-            self.past_moves.push({
-                "player_positions": dict(self.player_positions),
-                "dot_positions": list(self.dot_positions),
-                "current_player": self.current_player
-            })
+            # At this point, both moves are valid; the first move also records where the game started
+            if not self.history:
+                self.history.reset(self.position_key(player))
             
             # Update the L-piece position
             self.player_positions[player] = new_positions
@@ -845,7 +562,8 @@ class LGame:
                 from_pos, to_pos = neutral_move
                 self.dot_positions.remove(from_pos)
                 self.dot_positions.append(to_pos)
-                
+
+            self.history.push(self.position_key(other_player))
             return True
             
         except ValueError as e:
@@ -855,67 +573,109 @@ class LGame:
         
         
     def update_display(self):
-        self.screen.fill(self.black)
-        
-        # Calculate grid position to center it
+        """
+        Repaints only the parts of the screen whose content changed since the
+        last frame and pushes just those rectangles to the display
+        """
+        input_box_height = 80
         grid_width = self.grid_size * self.cell_size
         grid_height = self.grid_size * self.cell_size
         grid_x = (self.screen_width - grid_width) // 2
         grid_y = 50  # Offset from top
-        
-        # Draw grid with offset
-        for row in range(self.grid_size):
-            for col in range(self.grid_size):
-                x = grid_x + col * self.cell_size
-                y = grid_y + row * self.cell_size
-                pygame.draw.rect(self.screen, self.gray, 
-                            (x, y, self.cell_size, self.cell_size), 2)
 
-        # Draw player pieces with offset
-        for pos in self.player_positions["player1"]:
-            row, col = pos
-            x = grid_x + (row - 1) * self.cell_size
-            y = grid_y + (col - 1) * self.cell_size
-            pygame.draw.rect(self.screen, self.red, 
-                            (x, y, self.cell_size, self.cell_size))
-
-        for pos in self.player_positions["player2"]:
-            row, col = pos
-            x = grid_x + (row - 1) * self.cell_size
-            y = grid_y + (col - 1) * self.cell_size
-            pygame.draw.rect(self.screen, self.blue, 
-                            (x, y, self.cell_size, self.cell_size))
-
-        # Draw dots with offset
-        for position in self.dot_positions:
-            row, col = position
-            x = grid_x + (row - 1) * self.cell_size + self.cell_size // 2
-            y = grid_y + (col - 1) * self.cell_size + self.cell_size // 2
-            pygame.draw.circle(self.screen, self.white, (x, y), self.cell_size // 4)
-
-        # Draw input box at bottom
-        input_box_height = 80
-        pygame.draw.rect(self.screen, self.gray, 
-                        (20, self.screen_height - input_box_height - 20, 
-                        self.screen_width - 40, input_box_height))
-        input_surface = self.font.render(self.input_text, True, self.green)
-        self.screen.blit(input_surface, (30, self.screen_height - input_box_height - 10))
-
-        # Draw current player or game over message
-        if not self.game_over:
+        if self.game_over:
+            status = (self.winner_message, self.yellow, True)
+        else:
             if self.game_mode == "ai_vs_ai":
                 player_text = f"Current Player: AI {1 if self.current_player == 'player1' else 2}"
             else:
                 player_text = f"Current Player: {'Human' if self.current_player == 'player1' else ('AI' if self.game_mode == 'ai' else 'Human 2')}"
-            player_surface = self.font.render(player_text, True, self.white)
-            self.screen.blit(player_surface, (20, self.screen_height - input_box_height - 80))
-        else:
-            winner_surface = self.font.render(self.winner_message, True, self.yellow)
-            winner_rect = winner_surface.get_rect(center=(self.screen_width // 2, 
-                                                        self.screen_height - input_box_height - 80))
-            self.screen.blit(winner_surface, winner_rect)
+            status = (player_text, self.white, False)
+        regions = {
+            "board": (tuple(self.player_positions["player1"]), tuple(self.player_positions["player2"]),
+                      tuple(self.dot_positions)),
+            "status": status,
+            "input": self.input_text,
+        }
+
+        # Another screen drew over everything, so start from a blank frame
+        full_redraw = not self.drawn_regions
+        if full_redraw:
+            self.screen.fill(self.black)
+        dirty = []
+
+        if self.drawn_regions.get("board") != regions["board"]:
+            if self.board_background is None:
+                self.board_background = pygame.Surface((grid_width, grid_height))
+                self.board_background.fill(self.black)
+                for row in range(self.grid_size):
+                    for col in range(self.grid_size):
+                        pygame.draw.rect(self.board_background, self.gray,
+                                         (col * self.cell_size, row * self.cell_size, self.cell_size, self.cell_size), 2)
+            self.screen.blit(self.board_background, (grid_x, grid_y))
+
+            # Draw player pieces with offset
+            for positions, color in ((self.player_positions["player1"], self.red),
+                                     (self.player_positions["player2"], self.blue)):
+                for row, col in positions:
+                    x = grid_x + (row - 1) * self.cell_size
+                    y = grid_y + (col - 1) * self.cell_size
+                    pygame.draw.rect(self.screen, color, (x, y, self.cell_size, self.cell_size))
+
+            # Draw dots with offset
+            for row, col in self.dot_positions:
+                x = grid_x + (row - 1) * self.cell_size + self.cell_size // 2
+                y = grid_y + (col - 1) * self.cell_size + self.cell_size // 2
+                pygame.draw.circle(self.screen, self.white, (x, y), self.cell_size // 4)
+            dirty.append(pygame.Rect(grid_x, grid_y, grid_width, grid_height))
+
+        # Draw current player or game over message between the board and the input box
+        if self.drawn_regions.get("status") != regions["status"]:
+            status_top = grid_y + grid_height
+            status_rect = pygame.Rect(0, status_top, self.screen_width,
+                                      self.screen_height - input_box_height - 20 - status_top)
+            self.screen.fill(self.black, status_rect)
+            text, color, centred = status
+            text_surface = self.render_text(text, color)
+            if centred:
+                text_rect = text_surface.get_rect(center=(self.screen_width // 2,
+                                                          self.screen_height - input_box_height - 80))
+                self.screen.blit(text_surface, text_rect)
+            else:
+                self.screen.blit(text_surface, (20, self.screen_height - input_box_height - 80))
+            dirty.append(status_rect)
 
-        pygame.display.flip()
+        # Draw input box at bottom
+        if self.drawn_regions.get("input") != regions["input"]:
+            input_rect = pygame.Rect(0, self.screen_height - input_box_height - 20,
+                                     self.screen_width, input_box_height + 20)
+            self.screen.fill(self.black, input_rect)
+            pygame.draw.rect(self.screen, self.gray,
+                             (20, self.screen_height - input_box_height - 20,
+                              self.screen_width - 40, input_box_height))
+            input_surface = self.render_text(self.input_text, self.green)
+            self.screen.blit(input_surface, (30, self.screen_height - input_box_height - 10))
+            dirty.append(input_rect)
+
+        self.drawn_regions = regions
+        if full_redraw:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
+
+    def render_text(self, text, color):
+        """
+        Font surfaces are slow to render, so each (text, color) is rendered once
+        """
+        key = (text, color)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            # Typed input makes new strings forever; start over rather than grow without bound
+            if len(self.text_cache) >= 256:
+                self.text_cache.clear()
+            surface = self.font.render(text, True, color)
+            self.text_cache[key] = surface
+        return surface
 
     def draw_grid(self):
         for row in range(self.grid_size):
@@ -936,93 +696,45 @@ class LGame:
         y = (col - 1) * self.cell_size + self.cell_size // 2
         pygame.draw.circle(self.screen, color, (x, y), self.cell_size // 4)
 
-def generate_l_shape(x, y, orientation):
-    positions = []
-    if orientation == 'N':  # Vertical arm up
-        if x >= 3:  # Flip the piece if it's near the bottom edge
-            positions = [(x, y), (x, y - 1), (x - 1, y), (x - 2, y)]  # Flip upward
-        else: 
-            #print("Standard L-piece facing North at ({}, {})".format(x, y))
-            positions = [(x, y), (x, y - 1), (x + 1, y), (x + 2, y)]
-
-    elif orientation == 'S':  # Vertical arm down
-        if x <= 2:  # Flip the piece if it's near the top edge
-            #print("Flipping L-piece facing South near the top edge at ({}, {})".format(x, y))
-            positions = [(x, y), (x, y + 1), (x + 1, y), (x + 2, y)]  # Flip downward
-        else: 
-            #("Standard L-piece facing South at ({}, {})".format(x, y))
-            positions = [(x, y), (x, y + 1), (x - 1, y), (x - 2, y)]
-
-    elif orientation == 'E':  # Horizontal arm right
-        if y <= 2:  # Flip the piece if it's near the left edge
-            #print("Flipping L-piece facing East near the left edge at ({}, {})".format(x, y))
-            positions = [(x, y), (x + 1, y), (x, y + 1), (x, y + 2)]  # Flip rightward
-        else: 
-            #print("Standard L-piece facing East at ({}, {})".format(x, y))
-            positions = [(x, y), (x + 1, y), (x, y - 1), (x, y - 2)]
-
-    elif orientation == 'W':  # Horizontal arm left
-        if y >= 3:  # Flip the piece if it's near the right edge
-            #print("Flipping L-piece facing West near the right edge at ({}, {})".format(x, y))
-            positions = [(x, y), (x - 1, y), (x, y - 1), (x, y - 2)]  # Flip leftward
-        else:  
-            #print("Standard L-piece facing West at ({}, {})".format(x, y))
-            positions = [(x, y), (x, y + 1), (x, y + 2), (x - 1, y)]
-
-    else:
-        raise ValueError(f"Invalid orientation: {orientation}")
-    # Debug: Print the generated positions
-    #print("Generated positions for orientation {} at ({}, {}): {}".format(orientation, x, y, positions))
-    return positions
-
-def is_space_empty(new_positions, other_positions, neutral_positions):
-    new_pos_set = set(new_positions)
-    other_pos_set = set(other_positions)
-    neutral_pos_set = set(neutral_positions)
-    
-    # Check bounds first
-    if not all(1 <= pos[0] <= 4 and 1 <= pos[1] <= 4 for pos in new_pos_set):
-        return False
-    
-    # Use set operations for faster checking
-    return not (new_pos_set.intersection(other_pos_set) or 
-               new_pos_set.intersection(neutral_pos_set))
-
-class pastMoves:
+class BackgroundSearch:
+    """
+    Runs one agent call at a time on a worker thread so the window keeps
+    drawing and handling events while the AI thinks. kind names what is
+    running ("move" or "ponder") and stays set until it is polled or cancelled.
+    """
     def __init__(self):
-        self.stack = []
-
-    def push(self, state):
-        self.stack.append(state)
-
-    def pop(self):
-        if len(self.stack) != 0:
-            return self.stack.pop()
-    
-    def size(self):
-        return len(self.stack)
-    
-    def goBack(self, amountOfMoves):
-        if amountOfMoves <= 0:
-            print("Invalid number of moves to go back!")
-            return None
-        if self.size() == 0:
-            print("No more moves to undo!")
-            return None
-        
-        last_valid_state = None
-        for _ in range(amountOfMoves):
-            if self.size() > 0:
-                last_valid_state = self.pop()
-            else:
-                print("No more moves to undo!")
-                break
-
-        if last_valid_state:
-            return last_valid_state
-        else:
-            print("No more moves available to go back to!")
-            return None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = None
+        self.stop_event = None
+        self.kind = None
+
+    def start(self, kind, search, game_state):
+        """Calls search(game_state, stop_event=...) in the background"""
+        self.cancel()
+        self.stop_event = threading.Event()
+        self.kind = kind
+        self.future = self.executor.submit(search, game_state, stop_event=self.stop_event)
+
+    def poll(self):
+        """Returns (True, result) once the search has finished, else (False, None)"""
+        if self.future is None or not self.future.done():
+            return False, None
+        future = self.future
+        self.future = None
+        self.kind = None
+        return True, future.result()
+
+    def cancel(self):
+        """Asks the running search to stop; its result is discarded"""
+        if self.stop_event is not None:
+            self.stop_event.set()
+        self.future = None
+        self.stop_event = None
+        self.kind = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=True)
 
 def main():
     game = LGame()
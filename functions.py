@@ -1,14 +1,11 @@
-from main import * 
-from L_game import *
-from keyboard import *
 from util import *
+import util
 import sys
 import math
 import random
 import string
 import time
 import types
-import Tkinter
 
 #Grid size
 GRID_SIZE = 4
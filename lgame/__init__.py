@@ -0,0 +1,51 @@
+# lgame stores the L-game rules engine and search agents. Nothing here
+# imports pygame; the window lives in L-game.py.
+#
+# Names are loaded on first use, so a worker that only needs the bitboards
+# or move generator does not pay for importing the search.
+
+import importlib
+
+_EXPORTS = {
+    "BOARD_SIZE": "bitboard",
+    "Bitboard": "bitboard",
+    "L_PLACEMENTS": "movegen",
+    "Placement": "movegen",
+    "generate_l_shape": "movegen",
+    "is_space_empty": "movegen",
+    "legal_moves": "movegen",
+    "move_notation": "movegen",
+    "notation_to_move": "movegen",
+    "canonical_board": "symmetry",
+    "Tablebase": "tablebase",
+    "TranspositionTable": "transposition",
+    "DEFAULT_STATE": "engine",
+    "GameState": "engine",
+    "MinimaxAgent": "engine",
+    "SearchTimeout": "engine",
+    "parse_game_state": "engine",
+    "SearchStats": "stats",
+    "OpeningBook": "book",
+    "NegamaxAgent": "search",
+    "PVSAgent": "search",
+    "MTDfAgent": "search",
+    "make_agent": "search",
+    "MCTSAgent": "mcts",
+    "GameHistory": "history",
+    "GameRecordReader": "records",
+    "GameRecordWriter": "records",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(importlib.import_module("." + _EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,167 @@
+# benchmark.py stores the fixed-position search benchmark used to judge performance changes
+#
+# Usage: python -m lgame.benchmark --output bench.json [--baseline old.json] [--depths 1 2 3 4]
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from .engine import DEFAULT_STATE, parse_game_state
+from .search import ALGORITHMS, make_agent
+
+# Fixed positions, player1 to move
+POSITIONS = (
+    ("start", DEFAULT_STATE),
+    ("open", "3 1 W 1 1 3 4 1 2 E"),
+    ("middle_d", "3 4 N 1 1 4 3 3 2 N"),
+    ("middle_a", "3 4 E 2 4 4 1 1 3 E"),
+    ("middle_b", "1 2 N 2 3 4 4 3 4 N"),
+    ("middle_c", "3 1 W 2 2 4 1 1 4 E"),
+)
+
+DEPTHS = (1, 2, 3, 4)
+
+# A case regresses when it gets this much slower or hungrier than the baseline
+DEFAULT_THRESHOLD = 0.10
+
+# Each timed sample repeats the search until it has run this long, so cases
+# that take under a millisecond are not timed off a single noisy run
+MIN_SAMPLE_SECONDS = 0.05
+
+
+def run_case(state, depth, repeat=3, agent_options=None):
+    """
+    Searches state to depth with a fresh agent each time and returns nodes,
+    the best mean wall time per search over repeat samples of at least
+    MIN_SAMPLE_SECONDS, nodes/second and the peak traced memory of one extra
+    run. Memory is traced separately because tracemalloc slows the search down.
+    """
+    options = dict(agent_options or {}, depth=depth, verbose=False)
+    game_state = parse_game_state(state)
+    best_time = None
+    nodes = 0
+    move = None
+    for _ in range(repeat):
+        elapsed = 0.0
+        runs = 0
+        while runs == 0 or elapsed < MIN_SAMPLE_SECONDS:
+            agent = make_agent(**options)
+            started = time.perf_counter()
+            move = agent.getAction(game_state)
+            elapsed += time.perf_counter() - started
+            agent.close()
+            nodes = agent.nodes_expanded
+            runs += 1
+        if best_time is None or elapsed / runs < best_time:
+            best_time = elapsed / runs
+
+    tracemalloc.start()
+    try:
+        agent = make_agent(**options)
+        agent.getAction(game_state)
+        agent.close()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "nodes": nodes,
+        "seconds": best_time,
+        "nodes_per_second": nodes / best_time if best_time else 0.0,
+        "peak_memory_bytes": peak,
+        "move": move,
+    }
+
+
+def run_benchmark(positions=POSITIONS, depths=DEPTHS, repeat=3, agent_options=None):
+    """
+    Runs every (position, depth) case and returns the results as a dict ready for JSON
+    """
+    cases = []
+    for name, state in positions:
+        for depth in depths:
+            result = run_case(state, depth, repeat, agent_options)
+            result.update(name=name, state=state, depth=depth)
+            cases.append(result)
+    total_nodes = sum(case["nodes"] for case in cases)
+    total_seconds = sum(case["seconds"] for case in cases)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "agent_options": agent_options or {},
+        "repeat": repeat,
+        "cases": cases,
+        "total_nodes": total_nodes,
+        "total_seconds": total_seconds,
+        "nodes_per_second": total_nodes / total_seconds if total_seconds else 0.0,
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns a list of messages, one per case that got slower or used more
+    memory than baseline by more than threshold, or that now searches a
+    different number of nodes (a change in search behaviour, not speed), and
+    one more when the overall nodes/second dropped by more than threshold
+    """
+    previous = {(case["name"], case["depth"]): case for case in baseline["cases"]}
+    regressions = []
+    for case in results["cases"]:
+        label = "%s depth %d" % (case["name"], case["depth"])
+        old = previous.get((case["name"], case["depth"]))
+        if old is None:
+            continue
+        if case["nodes"] != old["nodes"]:
+            regressions.append("%s: nodes %d -> %d" % (label, old["nodes"], case["nodes"]))
+        if old["nodes_per_second"] and case["nodes_per_second"] < old["nodes_per_second"] * (1 - threshold):
+            regressions.append("%s: %.0f -> %.0f nodes/s" % (
+                label, old["nodes_per_second"], case["nodes_per_second"]))
+        if old["peak_memory_bytes"] and case["peak_memory_bytes"] > old["peak_memory_bytes"] * (1 + threshold):
+            regressions.append("%s: peak memory %d -> %d bytes" % (
+                label, old["peak_memory_bytes"], case["peak_memory_bytes"]))
+    if baseline["nodes_per_second"] and results["nodes_per_second"] < baseline["nodes_per_second"] * (1 - threshold):
+        regressions.append("total: %.0f -> %.0f nodes/s" % (baseline["nodes_per_second"], results["nodes_per_second"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark search agents over fixed positions")
+    parser.add_argument("--depths", type=int, nargs="+", default=list(DEPTHS))
+    parser.add_argument("--repeat", type=int, default=3, help="timed samples per case; the fastest counts")
+    parser.add_argument("--output", default=None, help="write results as JSON to this path")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown or memory growth as a fraction (default %(default)s)")
+    parser.add_argument("--algorithm", default="minimax", choices=sorted(ALGORITHMS))
+    args = parser.parse_args()
+
+    agent_options = {"algorithm": args.algorithm}
+    results = run_benchmark(depths=args.depths, repeat=args.repeat, agent_options=agent_options)
+    for case in results["cases"]:
+        print("%-11s depth %d: %7d nodes %8.4fs %9.0f nodes/s %9d bytes peak" % (
+            case["name"], case["depth"], case["nodes"], case["seconds"],
+            case["nodes_per_second"], case["peak_memory_bytes"]))
+    print("Total: %d nodes in %.3fs, %.0f nodes/s" % (
+        results["total_nodes"], results["total_seconds"], results["nodes_per_second"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print("Saved results to %s" % args.output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for message in regressions:
+            print("REGRESSION " + message)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against %s" % args.baseline)
+
+
+if __name__ == "__main__":
+    main()
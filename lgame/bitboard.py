@@ -0,0 +1,146 @@
+# bitboard.py stores the packed bitboard representation of the L-game board
+#
+# Square (x, y) with 1 <= x, y <= 4 maps to bit (x - 1) * 4 + (y - 1), so the
+# whole 4x4 board fits in a 16-bit mask. A position is three masks (one per
+# L piece, one shared by both neutral pieces) plus the side to move.
+
+BOARD_SIZE = 4
+FULL_MASK = 0xFFFF
+
+PLAYERS = ("player1", "player2")
+
+SQUARES = [(x, y) for x in range(1, BOARD_SIZE + 1) for y in range(1, BOARD_SIZE + 1)]
+SQUARE_BITS = {pos: 1 << index for index, pos in enumerate(SQUARES)}
+BIT_SQUARES = {bit: pos for pos, bit in SQUARE_BITS.items()}
+
+# The four squares with 2 <= x, y <= 3
+CENTRE_MASK = sum(bit for (x, y), bit in SQUARE_BITS.items() if 2 <= x <= 3 and 2 <= y <= 3)
+
+# SQUARE_NEIGHBOURS[bit] is the mask of squares orthogonally adjacent to bit
+SQUARE_NEIGHBOURS = {
+    bit: sum(SQUARE_BITS.get(adj, 0) for adj in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)))
+    for (x, y), bit in SQUARE_BITS.items()
+}
+
+
+def square_index(x, y):
+    return (x - 1) * BOARD_SIZE + (y - 1)
+
+
+def square_bit(x, y):
+    return 1 << square_index(x, y)
+
+
+def positions_to_mask(positions):
+    """
+    Packs a list of (x, y) squares into a 16-bit mask
+    """
+    mask = 0
+    for pos in positions:
+        bit = SQUARE_BITS.get(pos)
+        if bit is None:
+            raise ValueError(f"Position {pos} is out of bounds")
+        mask |= bit
+    return mask
+
+
+def mask_to_positions(mask):
+    """
+    Unpacks a 16-bit mask into a list of (x, y) squares
+    """
+    positions = []
+    while mask:
+        bit = mask & -mask
+        positions.append(BIT_SQUARES[bit])
+        mask ^= bit
+    return positions
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+class Bitboard:
+    """
+    Immutable position made of three occupancy masks and a side-to-move bit
+    (0 when player1 is to move, 1 when player2 is to move)
+    """
+    __slots__ = ("player1", "player2", "neutrals", "side")
+
+    def __init__(self, player1, player2, neutrals, side=0):
+        self.player1 = player1
+        self.player2 = player2
+        self.neutrals = neutrals
+        self.side = side
+
+    @classmethod
+    def from_positions(cls, player_positions, dot_positions, current_player):
+        return cls(positions_to_mask(player_positions["player1"]),
+                   positions_to_mask(player_positions["player2"]),
+                   positions_to_mask(dot_positions),
+                   PLAYERS.index(current_player))
+
+    def to_positions(self):
+        """
+        Returns the (player_positions, dot_positions, current_player) tuple form
+        """
+        player_positions = {
+            "player1": mask_to_positions(self.player1),
+            "player2": mask_to_positions(self.player2)
+        }
+        return player_positions, mask_to_positions(self.neutrals), PLAYERS[self.side]
+
+    def own(self):
+        return self.player2 if self.side else self.player1
+
+    def opponent(self):
+        return self.player1 if self.side else self.player2
+
+    def occupied(self):
+        return self.player1 | self.player2 | self.neutrals
+
+    def l_blockers(self):
+        """
+        Squares the side to move may not cover with its L piece
+        """
+        return self.opponent() | self.neutrals
+
+    def can_place_l(self, l_mask):
+        return l_mask != self.own() and not l_mask & self.l_blockers()
+
+    def can_move_neutral(self, l_mask, neutral_from, neutral_to):
+        """
+        Checks a neutral move made after the side to move has placed its L on l_mask
+        """
+        if not neutral_from & self.neutrals or neutral_from == neutral_to:
+            return False
+        return not neutral_to & (l_mask | self.opponent() | self.neutrals)
+
+    def successor(self, l_mask, neutral_from=0, neutral_to=0):
+        """
+        Applies a move given as masks; the neutral masks are 0 when no neutral moves
+        """
+        neutrals = self.neutrals ^ neutral_from | neutral_to
+        if self.side:
+            return Bitboard(self.player1, l_mask, neutrals, 0)
+        return Bitboard(l_mask, self.player2, neutrals, 1)
+
+    def key(self):
+        """
+        Packs the whole position into a single integer
+        """
+        return self.player1 | self.player2 << 16 | self.neutrals << 32 | self.side << 48
+
+    @classmethod
+    def from_key(cls, key):
+        return cls(key & FULL_MASK, key >> 16 & FULL_MASK, key >> 32 & FULL_MASK, key >> 48 & 1)
+
+    def __eq__(self, other):
+        return isinstance(other, Bitboard) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return "Bitboard(player1=%#06x, player2=%#06x, neutrals=%#06x, side=%d)" % (
+            self.player1, self.player2, self.neutrals, self.side)
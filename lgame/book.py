@@ -0,0 +1,138 @@
+# book.py stores the opening book: deep-searched best moves for positions near the usual starts
+#
+# Positions are stored by canonical key (see symmetry.py), so a start and its
+# rotations and reflections share one entry. The file is a small header
+# followed by (key, move) records sorted by key.
+#
+# Usage: python -m lgame.book [--plies 2] [--depth 4] [--workers 4] [--start "3 1 W 1 1 4 4 2 4 E"] [output_path]
+
+import argparse
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .bitboard import Bitboard
+from .engine import DEFAULT_STATE, GameState, MinimaxAgent, parse_game_state
+from .movegen import legal_moves, move_notation, notation_to_move, pack_move, unpack_move
+from .symmetry import canonical_board, untransform_move
+
+DEFAULT_PATH = "lgame_book.bin"
+
+MAGIC = b"LGBK"
+VERSION = 1
+# magic, version, search depth, entry count
+HEADER = struct.Struct("<4sHHI")
+# canonical position key, packed move
+ENTRY = struct.Struct("<QH")
+
+# The default start with either side moving first, as LGame offers
+DEFAULT_STARTS = ((DEFAULT_STATE, "player1"), (DEFAULT_STATE, "player2"))
+
+
+class OpeningBook:
+    """
+    Best moves by canonical position key, with lookups by Bitboard
+    """
+    def __init__(self, entries, depth=0):
+        # entries maps canonical key to a pack_move code in the canonical frame
+        self.entries = entries
+        self.depth = depth
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, depth, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a version %d opening book" % (path, VERSION))
+        if len(data) != HEADER.size + count * ENTRY.size:
+            raise ValueError("%s is truncated" % path)
+        entries = dict(ENTRY.iter_unpack(data[HEADER.size:]))
+        return cls(entries, depth)
+
+    def save(self, path=DEFAULT_PATH):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.depth, len(self.entries)))
+            for key in sorted(self.entries):
+                f.write(ENTRY.pack(key, self.entries[key]))
+
+    def probe(self, board):
+        """
+        Returns the book move for board as (placement, neutral_from, neutral_to), or None
+        """
+        canonical, transform = canonical_board(board)
+        code = self.entries.get(canonical.key())
+        if code is None:
+            return None
+        move = notation_to_move(untransform_move(move_notation(unpack_move(code)), transform))
+        # A damaged or mismatched file must not make the agent play an illegal move
+        if move not in legal_moves(board, neutral_optional=True):
+            return None
+        return move
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def _search_position(task):
+    key, depth = task
+    agent = MinimaxAgent(depth=depth, verbose=False)
+    move = agent.getAction(GameState.fromBitboard(Bitboard.from_key(key)))
+    return key, pack_move(notation_to_move(move)) if move else None
+
+
+def build_book(starts=DEFAULT_STARTS, plies=2, depth=4, workers=1):
+    """
+    Searches every position within plies moves of the starts (each a
+    (state string, side to move) pair) to depth and returns an OpeningBook.
+    All replies are followed, including L-only moves, since a human may play any of them.
+    """
+    level = set()
+    for state, player in starts:
+        level.add(canonical_board(parse_game_state(state, player).toBitboard())[0].key())
+
+    entries = {}
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        for ply in range(plies):
+            tasks = [(key, depth) for key in sorted(level) if key not in entries]
+            results = executor.map(_search_position, tasks) if executor else map(_search_position, tasks)
+            for key, code in results:
+                if code is not None:
+                    entries[key] = code
+            if ply == plies - 1:
+                break
+            next_level = set()
+            for key in level:
+                board = Bitboard.from_key(key)
+                for placement, neutral_from, neutral_to in legal_moves(board, neutral_optional=True):
+                    child = board.successor(placement.mask, neutral_from, neutral_to)
+                    next_level.add(canonical_board(child)[0].key())
+            level = next_level
+    finally:
+        if executor:
+            executor.shutdown()
+    return OpeningBook(entries, depth)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the L-game opening book")
+    parser.add_argument("output", nargs="?", default=DEFAULT_PATH)
+    parser.add_argument("--plies", type=int, default=2, help="book positions up to this many moves deep")
+    parser.add_argument("--depth", type=int, default=4, help="search depth for each book move")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--start", action="append", default=None,
+                        help="start state, player1 and player2 to move; repeatable (default '%s')" % DEFAULT_STATE)
+    args = parser.parse_args()
+
+    states = args.start or [DEFAULT_STATE]
+    starts = [(state, player) for state in states for player in ("player1", "player2")]
+    started = time.perf_counter()
+    book = build_book(starts, args.plies, args.depth, args.workers)
+    book.save(args.output)
+    print("Book of %d positions (depth %d) built in %.1fs, saved to %s" % (
+        len(book), args.depth, time.perf_counter() - started, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,702 @@
+# engine.py stores the L-game rules (GameState) and the minimax search agent.
+# It does not import pygame, so searches and batch jobs can run headless.
+
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from .bitboard import BIT_SQUARES, CENTRE_MASK, SQUARE_NEIGHBOURS, Bitboard, popcount
+from .movegen import (count_legal_moves, generate_l_shape, has_l_move, l_move_count, legal_l_placements,
+                      legal_moves, move_notation, split_bits)
+from .ordering import MoveOrderer
+from .searchstate import SearchState
+from .stats import SearchStats
+from .symmetry import canonical_board
+from .tablebase import Tablebase
+from .transposition import EXACT, LOWER, PATH_DEPENDENT, UPPER, ZOBRIST_MAXIMIZING, TranspositionTable, zobrist_hash
+
+DEFAULT_STATE = "3 1 W 1 1 4 4 2 4 E"
+
+# Score of a repeated position for searches whose scores are relative to the
+# side to move
+DRAW_SCORE = 0
+
+# MinimaxAgent's evaluateBoard is not centred on zero, so it scores a repeated
+# position as the median evaluateBoard value over every position that is not lost
+MINIMAX_DRAW_SCORE = 687
+
+
+class GameState:
+    def __init__(self, player_positions, dot_positions, current_player, history=()):
+        self.player_positions = player_positions
+        self.dot_positions = dot_positions
+        self.current_player = current_player
+        # Packed keys of the positions played before this one, oldest first;
+        # searches score a return to any of them as a draw
+        self.history = history
+
+    def getNumAgents(self):
+        return 2
+
+    def toBitboard(self):
+        """
+        Packs this state into occupancy masks
+        """
+        return Bitboard.from_positions(self.player_positions, self.dot_positions, self.current_player)
+
+    @classmethod
+    def fromBitboard(cls, board, history=()):
+        return cls(*board.to_positions(), history=history)
+
+    def canonicalize(self):
+        """
+        Returns (canonical state, transform) for the symmetry class of this state.
+        Moves found on the canonical state map back with symmetry.untransform_move.
+        """
+        board, transform = canonical_board(self.toBitboard())
+        return GameState.fromBitboard(board), transform
+
+    def generateSuccessor(self, agentIndex, move):
+        x, y, orientation = move
+        player = "player1" if agentIndex == 0 else "player2"
+        
+        new_positions = generate_l_shape(x, y, orientation)
+        new_player_positions = dict(self.player_positions)
+        new_player_positions[player] = new_positions
+        
+        return GameState(new_player_positions, self.dot_positions, 
+                        "player2" if self.current_player == "player1" else "player1")
+
+    def isWin(self):
+        board = self.toBitboard()
+        return not has_l_move(board.opponent(), board.own() | board.neutrals)
+
+    def isLose(self):
+        board = self.toBitboard()
+        return not has_l_move(board.own(), board.l_blockers())
+
+    def getLegalMoves(self, agentIndex):
+        board = self.toBitboard()
+        own = board.player2 if agentIndex else board.player1
+        blockers = (board.player1 if agentIndex else board.player2) | board.neutrals
+        return [placement.notation for placement in legal_l_placements(own, blockers)]
+    
+    
+    
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when its time or node budget runs out
+    """
+    pass
+
+
+class MinimaxAgent:
+    # alphabeta treats 50 moves as the end of the game, so deeper iterations change nothing
+    MAX_SEARCH_DEPTH = 50
+    # What the search scores a repeated position as
+    draw_score = MINIMAX_DRAW_SCORE
+
+    def __init__(self, depth='inf', tablebase=None, tt_size=1 << 16, time_limit=None, node_limit=None,
+                 seed=None, workers=1, verbose=True, stats_path=None, book=None):
+        self.depth = float('inf') if depth == 'inf' else int(depth)
+        self.verbose = verbose
+        # Statistics of the latest getAction, also appended to stats_path as JSON lines when set
+        self.stats = SearchStats()
+        self.stats_path = stats_path
+        self.tt_size = tt_size
+        self.seed = seed
+        # With more than one worker the root moves are split across a process pool
+        self.workers = workers
+        self.executor = None
+        # Shared with the worker processes; set to stop the subtrees still being searched
+        self.cancel_event = None
+        # Random tie-breaking between equally ordered moves only happens with a seed
+        self.orderer = MoveOrderer(seed)
+        # Default per-move budgets; seconds of wall clock and nodes expanded
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.deadline = None
+        self.node_budget = None
+        self.stop_event = None
+        self.completed_depth = 0
+        self.nodes_expanded = 0
+        # Zobrist hash -> count of the positions on the game path and the current search path
+        self.path_hashes = {}
+        # Repetitions scored so far; a node whose search raised it stores a PATH_DEPENDENT entry
+        self.repetitions_seen = 0
+        # Bounded table keyed by Zobrist hash; kept across moves and games
+        self.tt = TranspositionTable(tt_size)
+        # Solved positions answer getAction without searching
+        if isinstance(tablebase, str):
+            tablebase = Tablebase.load(tablebase)
+        self.tablebase = tablebase
+        # Book moves are played before any search; book.py imports this module, hence the late import
+        if isinstance(book, str):
+            from .book import OpeningBook
+            book = OpeningBook.load(book)
+        self.book = book
+
+    def getAction(self, gameState, time_limit=None, node_limit=None, stop_event=None):
+        """
+        Returns the minimax action using alpha-beta pruning. Searches depth 1, 2, ...
+        up to self.depth and, when a time or node budget is set, returns the best
+        move of the deepest iteration that finished within it. Setting stop_event
+        (a threading.Event) from another thread ends the search the same way.
+        """
+        self.stop_event = stop_event
+        self.nodes_expanded = 0
+        self.completed_depth = 0
+        self.stats = stats = SearchStats()
+        time_limit = self.time_limit if time_limit is None else time_limit
+        node_limit = self.node_limit if node_limit is None else node_limit
+        start_time = time.time()
+        
+        if self.tablebase is not None:
+            move = self.tablebase.best_move(gameState.toBitboard())
+            stats.source = "tablebase"
+            stats.move = move_notation(move) if move else None
+            self.finishStats(start_time)
+            return stats.move
+
+        if self.book is not None:
+            move = self.book.probe(gameState.toBitboard())
+            if move is not None:
+                stats.source = "book"
+                stats.move = move_notation(move)
+                self.finishStats(start_time)
+                return stats.move
+        
+        valid_moves = self.getLegalMovesWithNeutral(gameState)
+        if not valid_moves:
+            self.finishStats(start_time)
+            return None
+            
+        self.tt.new_search()
+        self.orderer.new_search()
+        tt_probes, tt_hits = self.tt.probes, self.tt.hits
+        search_state = SearchState(gameState.toBitboard())
+        self.path_hashes = path_counts(gameState.history)
+        action = None
+        depth = 1
+        while depth <= min(self.depth, self.MAX_SEARCH_DEPTH):
+            # Depth 1 always completes so there is a move to fall back on
+            if depth > 1:
+                self.deadline = start_time + time_limit if time_limit is not None else None
+                self.node_budget = node_limit
+            iteration_start, iteration_nodes = time.time(), self.nodes_expanded
+            try:
+                score, iteration_action = self.searchIteration(search_state, depth, action)
+            except SearchTimeout:
+                break
+            finally:
+                self.deadline = None
+                self.node_budget = None
+            action = iteration_action or action
+            self.completed_depth = depth
+            stats.record_iteration(depth, self.nodes_expanded - iteration_nodes, time.time() - iteration_start, score)
+            stats.score = score
+            # A forced win or loss will not change with more depth
+            if self.isDecided(score):
+                break
+            depth += 1
+        if self.verbose:
+            print(f"Nodes expanded: {self.nodes_expanded} (depth {self.completed_depth})")
+        
+        stats.tt_probes += self.tt.probes - tt_probes
+        stats.tt_hits += self.tt.hits - tt_hits
+        if action:
+            stats.move = move_notation(action)
+            # A fresh state, in case an aborted iteration left search_state off the root
+            stats.principal_variation = self.principalVariation(SearchState(gameState.toBitboard()), action)
+        else:
+            # Fallback to any valid move if alphabeta fails
+            l_move, neutral_move = valid_moves[0]
+            stats.move = (l_move[0], l_move[1], l_move[2], neutral_move)
+        self.finishStats(start_time)
+        return stats.move
+
+    def searchIteration(self, state, depth, first_move):
+        """
+        One iterative-deepening iteration from the root; returns (score, move).
+        Other search algorithms override this.
+        """
+        if self.workers > 1 and depth > 1:
+            return self.searchRootParallel(state, depth, first_move=first_move)
+        return self.alphabeta(state, depth, float('-inf'), float('inf'), True, first_move=first_move)
+
+    def isDecided(self, score):
+        # Only lostScore is infinite, so an infinite score is a proven win or loss
+        return score in (float('inf'), float('-inf'))
+
+    def lostScore(self, maximizingPlayer):
+        """
+        Score of a position whose side to move has lost, for the maximizing root player
+        """
+        return float('-inf') if maximizingPlayer else float('inf')
+
+    def finishStats(self, start_time):
+        stats = self.stats
+        stats.nodes = self.nodes_expanded
+        stats.completed_depth = self.completed_depth
+        stats.seconds = time.time() - start_time
+        if self.stats_path is not None:
+            stats.write_json_line(self.stats_path)
+
+    def ttKey(self, state, ply):
+        """
+        Transposition table key of a SearchState ply moves below the root; the
+        maximizing root player is to move on even plies
+        """
+        return state.hash ^ ZOBRIST_MAXIMIZING if ply % 2 == 0 else state.hash
+
+    def principalVariation(self, state, first_move):
+        """
+        Follows best moves stored in the transposition table from the root,
+        starting with first_move, for at most completed_depth moves
+        """
+        moves = [first_move]
+        undo_tokens = [state.make_move(first_move)]
+        try:
+            while len(moves) < self.completed_depth:
+                entry = self.tt.probe(self.ttKey(state, len(moves)))
+                # Only trust a move that is legal here; the slot may hold another position's entry
+                if entry is None or entry[3] is None or entry[3] not in legal_moves(state):
+                    break
+                moves.append(entry[3])
+                undo_tokens.append(state.make_move(entry[3]))
+        finally:
+            for undo_token in reversed(undo_tokens):
+                state.unmake_move(undo_token)
+        return [move_notation(move) for move in moves]
+
+    def ponder(self, gameState, stop_event, replies=3):
+        """
+        Searches our answers to the opponent's likeliest replies while the opponent
+        is thinking, until stop_event is set. Nothing is returned; the point is a
+        warm transposition table when the real reply arrives. Likely replies are
+        the ones leaving us the fewest L moves.
+        """
+        board = gameState.toBitboard()
+        mover = board.opponent()
+
+        def our_mobility(move):
+            placement, neutral_from, neutral_to = move
+            return l_move_count(mover, placement.mask | board.neutrals ^ neutral_from | neutral_to)
+
+        candidates = sorted(legal_moves(board, neutral_optional=True), key=our_mobility)[:replies]
+        verbose = self.verbose
+        self.verbose = False
+        try:
+            for placement, neutral_from, neutral_to in candidates:
+                if stop_event.is_set():
+                    break
+                reply = board.successor(placement.mask, neutral_from, neutral_to)
+                history = tuple(gameState.history) + (board.key(),)
+                self.getAction(GameState.fromBitboard(reply, history), stop_event=stop_event)
+        finally:
+            self.verbose = verbose
+
+    def alphabeta(self, state, depth, alpha, beta, maximizingPlayer, moves_made=0, first_move=None):
+        """
+        Searches a SearchState in place; moves are (placement, neutral_from, neutral_to)
+        and every make_move is paired with an unmake_move before returning
+        """
+        # Returning to a position on the game or search path is a draw, whatever lies beyond it
+        if moves_made > 0 and state.hash in self.path_hashes:
+            self.stats.repetitions += 1
+            self.repetitions_seen += 1
+            return self.draw_score, None
+
+        tt_key = self.ttKey(state, moves_made)
+        entry = self.tt.probe(tt_key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, flag, entry_value, entry_move = entry
+            tt_move = entry_move
+            # Only reuse results searched to exactly this depth, so a position scores the same
+            # whatever the table holds and parallel root searches agree with the serial one.
+            # Bounds are only used when they settle this window, and the root always searches.
+            if entry_depth == depth and moves_made > 0:
+                if (flag == EXACT or
+                    (flag == LOWER and entry_value >= beta) or
+                    (flag == UPPER and entry_value <= alpha)):
+                    self.stats.tt_cutoffs += 1
+                    return entry_value, entry_move
+        
+        self.nodes_expanded += 1
+        self.checkBudget()
+        
+        # A side to move with no L move has lost; that is the only end of the game
+        if not has_l_move(state.own(), state.opponent() | state.neutrals):
+            score = self.lostScore(maximizingPlayer)
+            self.stats.leaf_evaluations += 1
+            self.tt.store(tt_key, depth, EXACT, score, None)
+            return score, None
+        if depth == 0 or moves_made >= 50:
+            score = self.evaluateBoard(state)
+            self.stats.leaf_evaluations += 1
+            self.tt.store(tt_key, depth, EXACT, score, None)
+            return score, None
+        
+        # Search the previous iteration's best move first, then the stored best move
+        valid_moves = self.orderer.order(legal_moves(state), state, moves_made, first_move or tt_move,
+                                         static_only=moves_made == 0)
+        
+        alpha_orig, beta_orig = alpha, beta
+        best_move = None
+        repetitions_seen = self.repetitions_seen
+        # Saved because an aborted child search can leave state anywhere below this node
+        node_hash = state.hash
+        self.enterPath(node_hash)
+        try:
+            if maximizingPlayer:
+                value = float('-inf')
+                for move in valid_moves:
+                    undo_token = state.make_move(move)
+                    try:
+                        new_score, _ = self.alphabeta(state, depth - 1, alpha, beta, False, moves_made + 1)
+                    finally:
+                        # A SearchTimeout must still leave the root position as it found it
+                        state.unmake_move(undo_token)
+                    if new_score > value:
+                        value = new_score
+                        best_move = move
+                    alpha = max(alpha, value)
+                    if beta <= alpha:
+                        self.orderer.record_cutoff(move, moves_made, depth)
+                        self.stats.record_cutoff(moves_made)
+                        break
+            else:
+                value = float('inf')
+                for move in valid_moves:
+                    undo_token = state.make_move(move)
+                    try:
+                        new_score, _ = self.alphabeta(state, depth - 1, alpha, beta, True, moves_made + 1)
+                    finally:
+                        # A SearchTimeout must still leave the root position as it found it
+                        state.unmake_move(undo_token)
+                    if new_score < value:
+                        value = new_score
+                        best_move = move
+                    beta = min(beta, value)
+                    if beta <= alpha:
+                        self.orderer.record_cutoff(move, moves_made, depth)
+                        self.stats.record_cutoff(moves_made)
+                        break
+        finally:
+            self.leavePath(node_hash)
+        
+        # A value outside the original window is only a bound on the true score
+        if self.repetitions_seen != repetitions_seen:
+            flag = PATH_DEPENDENT
+        elif value <= alpha_orig:
+            flag = UPPER
+        elif value >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(tt_key, depth, flag, value, best_move)
+        return value, best_move
+
+    def enterPath(self, position_hash):
+        self.path_hashes[position_hash] = self.path_hashes.get(position_hash, 0) + 1
+
+    def leavePath(self, position_hash):
+        count = self.path_hashes[position_hash] - 1
+        if count:
+            self.path_hashes[position_hash] = count
+        else:
+            del self.path_hashes[position_hash]
+
+    def searchRootParallel(self, state, depth, first_move=None):
+        """
+        Searches each root move in a worker process and returns (value, move)
+        exactly as alphabeta would at the root. Moves are submitted in root order
+        and each is searched with alpha set to the best value already returned;
+        every finished move comes earlier in that order, so ties resolve the same
+        way as in the serial search. A node budget is split between the searches
+        in flight, and any still running when this returns are cancelled through
+        cancel_event. Falls back to alphabeta if no pool is available.
+        """
+        executor = self.getExecutor()
+        root_moves = self.orderer.order(legal_moves(state), state, 0, first_move, static_only=True)
+        if executor is None or len(root_moves) < 2:
+            return self.alphabeta(state, depth, float('-inf'), float('inf'), True, first_move=first_move)
+
+        self.nodes_expanded += 1
+        best_value = float('-inf')
+        best_index = None
+        # future -> (root move index, alpha it was searched with, nodes it may expand)
+        pending = {}
+        next_index = 0
+        # Workers need the path up to and including the root to see repetitions
+        self.enterPath(state.hash)
+        path = tuple(self.path_hashes.items())
+        self.leavePath(state.hash)
+        try:
+            while next_index < len(root_moves) or pending:
+                while next_index < len(root_moves) and len(pending) < self.workers:
+                    undo_token = state.make_move(root_moves[next_index])
+                    node_budget = None
+                    if self.node_budget is not None:
+                        # Split what the running searches have not claimed between the free workers
+                        unclaimed = self.node_budget - self.nodes_expanded - sum(
+                            budget for _, _, budget in pending.values())
+                        node_budget = max(unclaimed // (self.workers - len(pending)), 1)
+                    future = executor.submit(_searchRootMove, state.key(), depth - 1, best_value,
+                                             self.deadline, node_budget, path)
+                    state.unmake_move(undo_token)
+                    pending[future] = (next_index, best_value, node_budget)
+                    next_index += 1
+                # Wake up regularly so a stop request is noticed while workers are busy
+                done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                if self.stop_event is not None and self.stop_event.is_set():
+                    raise SearchTimeout()
+                for future in done:
+                    index, alpha, _ = pending.pop(future)
+                    value, worker_stats = future.result()
+                    self.nodes_expanded += worker_stats.nodes
+                    self.stats.merge(worker_stats)
+                    if value is None:
+                        raise SearchTimeout()
+                    # A value at or below the alpha it was searched with is only an upper bound
+                    if value > alpha and (value > best_value or (value == best_value and index < best_index)):
+                        best_value = value
+                        best_index = index
+        except BrokenProcessPool:
+            self.close()
+            return self.alphabeta(state, depth, float('-inf'), float('inf'), True, first_move=first_move)
+        finally:
+            if pending:
+                # Stop the subtrees still running so the next search gets idle workers
+                self.cancel_event.set()
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+                self.cancel_event.clear()
+        return best_value, root_moves[best_index] if best_index is not None else None
+
+    def getExecutor(self):
+        if self.executor is None:
+            try:
+                self.cancel_event = multiprocessing.Event()
+                self.executor = ProcessPoolExecutor(self.workers, initializer=_initSearchWorker,
+                                                    initargs=(self.tt_size, self.seed, self.cancel_event))
+            except (OSError, NotImplementedError, ImportError):
+                # No process support here; the caller searches serially instead
+                self.workers = 1
+        return self.executor
+
+    def close(self):
+        """
+        Shuts down the worker processes, if any were started
+        """
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def checkBudget(self):
+        """
+        Aborts the current iteration once the node or time budget is spent
+        """
+        if self.node_budget is not None and self.nodes_expanded >= self.node_budget:
+            raise SearchTimeout()
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout()
+        # Reading the clock is comparatively slow, so only do it every 64 nodes
+        if self.deadline is not None and self.nodes_expanded % 64 == 0 and time.time() >= self.deadline:
+            raise SearchTimeout()
+
+    def getSuccessor(self, state, move):
+        """
+        Gets the successor state after applying a combined move
+        """
+        x, y, orientation, neutral_move = move
+        if neutral_move is None:
+            return None
+            
+        # Verify L piece move
+        new_l_positions = generate_l_shape(x, y, orientation)
+        other_player = "player2" if state.current_player == "player1" else "player1"
+        
+        # Check for collisions
+        other_pieces = set(state.player_positions[other_player])
+        dots = set(state.dot_positions)
+        
+        # Validate L piece positions
+        for pos in new_l_positions:
+            if not (1 <= pos[0] <= 4 and 1 <= pos[1] <= 4):
+                return None
+            if pos in other_pieces or pos in dots:
+                return None
+                
+        # Validate neutral piece movement
+        old_pos, new_pos = neutral_move
+        if old_pos not in state.dot_positions:
+            return None
+            
+        if not (1 <= new_pos[0] <= 4 and 1 <= new_pos[1] <= 4):
+            return None
+            
+        if (new_pos in new_l_positions or 
+            new_pos in state.player_positions[other_player] or 
+            new_pos in state.dot_positions):
+            return None
+        
+        # All validations passed, create new state
+        new_player_positions = dict(state.player_positions)
+        new_player_positions[state.current_player] = new_l_positions
+        new_dot_positions = list(state.dot_positions)
+        
+        # Apply neutral piece movement
+        new_dot_positions.remove(old_pos)
+        new_dot_positions.append(new_pos)
+            
+        return GameState(new_player_positions, new_dot_positions, 
+                        "player2" if state.current_player == "player1" else "player1")
+
+    def coversNewSquare(self, old_positions, new_positions):
+        """
+        Check if the new L-piece position covers at least one square
+        that wasn't covered by the old position
+        """
+        old_set = set(old_positions)
+        new_set = set(new_positions)
+        return bool(new_set - old_set)  # Returns True if there are any new squares
+
+    def getLegalMovesWithNeutral(self, state):
+        """
+        Gets all legal moves with mandatory neutral piece movement and new square coverage
+        """
+        combined_moves = []
+        
+        # Scan the precomputed placement masks instead of rebuilding geometry
+        for placement, neutral_from, neutral_to in legal_moves(state.toBitboard()):
+            neutral_move = (BIT_SQUARES[neutral_from], BIT_SQUARES[neutral_to])
+            combined_moves.append((placement.notation, neutral_move))
+        
+        return combined_moves
+
+    def isValidNeutralMove(self, state, old_pos, new_pos, new_l_positions):
+        """
+        Checks if a neutral piece movement is valid with the given L-piece positions
+        """
+        # Must be within bounds
+        if not (1 <= new_pos[0] <= 4 and 1 <= new_pos[1] <= 4):
+            return False
+            
+        # Can't overlap with other pieces
+        if (new_pos in new_l_positions or 
+            new_pos in state.player_positions["player1"] or 
+            new_pos in state.dot_positions or 
+            new_pos == old_pos):
+            return False
+            
+        return True
+
+
+    def evaluationFunction(self, state):
+        """
+        Heuristic evaluation function
+        """
+        return self.evaluateBoard(state.toBitboard())
+
+    def evaluateBoard(self, board):
+        """
+        evaluationFunction on occupancy masks; counts moves instead of generating them.
+        A side to move with no L move has lost and scores -inf.
+        """
+        if not has_l_move(board.own(), board.l_blockers()):
+            return float('-inf')
+            
+        score = 0
+        
+        # Mobility score
+        player2_moves = count_legal_moves(board)
+        # Approximate player1's moves since we don't need exact neutral moves calculation
+        player1_moves = l_move_count(board.player1, board.player2 | board.neutrals)
+        mobility_score = player2_moves - player1_moves
+        score += mobility_score * 10
+        
+        # Territory control for L-piece: 2 per centre square, 1 per edge square
+        score += 4 + popcount(board.player2 & CENTRE_MASK)
+        
+        # Neutral piece positioning
+        for dot_bit in split_bits(board.neutrals):
+            if dot_bit & CENTRE_MASK:
+                score += 1
+            # Bonus for blocking opponent's potential moves
+            score += 2 * popcount(SQUARE_NEIGHBOURS[dot_bit] & board.player1)
+        
+        return score
+    
+    
+# Agent owned by each root-split worker process; its transposition table lives
+# as long as the process does
+_worker_agent = None
+
+
+def _initSearchWorker(tt_size, seed, cancel_event=None):
+    global _worker_agent
+    _worker_agent = MinimaxAgent(tt_size=tt_size, seed=seed, verbose=False)
+    # checkBudget aborts the worker's search once the parent sets it
+    _worker_agent.stop_event = cancel_event
+
+
+def _searchRootMove(position_key, depth, alpha, deadline, node_budget, path=()):
+    """
+    Searches the position after one root move for a worker process; path
+    holds the (hash, count) pairs of the positions leading to it.
+    Returns (value, SearchStats), with value None if the budget ran out.
+    """
+    agent = _worker_agent
+    agent.path_hashes = dict(path)
+    agent.nodes_expanded = 0
+    agent.stats = stats = SearchStats()
+    tt_probes, tt_hits = agent.tt.probes, agent.tt.hits
+    agent.deadline = deadline
+    agent.node_budget = node_budget
+    agent.orderer.new_search()
+    agent.tt.new_search()
+    state = SearchState(Bitboard.from_key(position_key))
+    try:
+        value, _ = agent.alphabeta(state, depth, alpha, float('inf'), False, moves_made=1)
+    except SearchTimeout:
+        value = None
+    stats.nodes = agent.nodes_expanded
+    stats.tt_probes = agent.tt.probes - tt_probes
+    stats.tt_hits = agent.tt.hits - tt_hits
+    return value, stats
+
+
+def path_counts(keys):
+    """
+    Zobrist hash -> count for the packed position keys of a game path
+    """
+    counts = {}
+    for key in keys:
+        position_hash = zobrist_hash(Bitboard.from_key(key))
+        counts[position_hash] = counts.get(position_hash, 0) + 1
+    return counts
+
+
+def parse_game_state(text, current_player="player1"):
+    """
+    Parses a 'P1(x y D) n1x n1y n2x n2y P2(x y D)' string such as DEFAULT_STATE
+    """
+    tokens = text.split()
+    if len(tokens) != 10:
+        raise ValueError("Invalid input format. Must provide exactly 10 values.")
+
+    player1_positions = generate_l_shape(int(tokens[0]), int(tokens[1]), tokens[2].upper())
+    neutral_1 = (int(tokens[3]), int(tokens[4]))
+    neutral_2 = (int(tokens[5]), int(tokens[6]))
+    player2_positions = generate_l_shape(int(tokens[7]), int(tokens[8]), tokens[9].upper())
+
+    all_positions = set(player1_positions + player2_positions + [neutral_1, neutral_2])
+    if len(all_positions) != 10 or not all(1 <= x <= 4 and 1 <= y <= 4 for x, y in all_positions):
+        raise ValueError("Pieces overlap or are invalid.")
+
+    player_positions = {"player1": player1_positions, "player2": player2_positions}
+    return GameState(player_positions, [neutral_1, neutral_2], current_player)
@@ -0,0 +1,116 @@
+# history.py stores the game history used for undo and redo
+#
+# Every position of the game is kept as one packed Bitboard key in an
+# array('Q'), 8 bytes a ply, so a long session costs kilobytes rather than a
+# dict of lists per move.
+
+from array import array
+
+# Plies kept before the oldest positions are dropped
+DEFAULT_CAP = 4096
+
+# A game is drawn once the same position, with the same side to move, has occurred this often
+DRAW_REPETITIONS = 3
+
+
+class GameHistory:
+    """
+    The positions of a game from its start (or the oldest one the cap kept) to
+    the last move played. A cursor marks the current position: undo and redo
+    move the cursor, and rewinding to any ply is one index, not a replay. A new
+    move played after an undo discards the positions that could have been redone.
+    """
+    def __init__(self, cap=DEFAULT_CAP):
+        if cap < 1:
+            raise ValueError("History cap must be at least one ply")
+        self.cap = cap
+        self.keys = array('Q')
+        self.cursor = -1
+        # Ply number of keys[0]; grows as the cap drops old positions
+        self.first_ply = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def reset(self, key):
+        """
+        Starts a new game from the position with this key
+        """
+        self.keys = array('Q', [key])
+        self.cursor = 0
+        self.first_ply = 0
+
+    def push(self, key):
+        """
+        Records the position reached by a move from the current one
+        """
+        if not self.keys:
+            raise ValueError("History has no start position; call reset first")
+        del self.keys[self.cursor + 1:]
+        self.keys.append(key)
+        self.cursor += 1
+        excess = len(self.keys) - self.cap - 1
+        if excess > 0:
+            del self.keys[:excess]
+            self.cursor -= excess
+            self.first_ply += excess
+
+    def current(self):
+        return self.keys[self.cursor] if self.keys else None
+
+    def ply(self):
+        """
+        Moves played from the start of the game to the current position
+        """
+        return self.first_ply + self.cursor
+
+    def last_ply(self):
+        return self.first_ply + len(self.keys) - 1
+
+    def undo_count(self):
+        return max(self.cursor, 0)
+
+    def redo_count(self):
+        return len(self.keys) - 1 - self.cursor if self.keys else 0
+
+    def rewind(self, ply):
+        """
+        Makes the position after ply moves current and returns its key
+        """
+        if not self.first_ply <= ply <= self.last_ply():
+            raise ValueError("Ply %d is not in the history (plies %d to %d)" % (ply, self.first_ply,
+                                                                                self.last_ply()))
+        self.cursor = ply - self.first_ply
+        return self.keys[self.cursor]
+
+    def undo(self, amount=1):
+        """
+        Steps back up to amount moves and returns the new current key, or None
+        when there is nothing to undo
+        """
+        if not self.undo_count():
+            return None
+        return self.rewind(max(self.ply() - amount, self.first_ply))
+
+    def redo(self, amount=1):
+        """
+        Replays up to amount undone moves and returns the new current key, or
+        None when there is nothing to redo
+        """
+        if not self.redo_count():
+            return None
+        return self.rewind(min(self.ply() + amount, self.last_ply()))
+
+    def repetitions(self, key=None):
+        """
+        How often key (the current position by default) occurs up to the current ply
+        """
+        if not self.keys:
+            return 0
+        return self.path().count(self.current() if key is None else key)
+
+    def path(self):
+        """
+        Keys from the oldest kept position to the current one
+        """
+        return self.keys[:self.cursor + 1]
@@ -0,0 +1,292 @@
+# mcts.py stores the Monte Carlo tree search agent (UCT with fast playouts)
+#
+# The agent needs no evaluation function: moves are rated by the results of
+# random games played out from them. It answers getAction like MinimaxAgent.
+
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .bitboard import FULL_MASK, Bitboard
+from .movegen import (DESTINATION_MASKS, has_l_move, legal_moves, move_notation, pack_move, split_bits,
+                      unpack_move)
+from .stats import SearchStats
+
+# Playouts still running after this many plies count as draws
+PLAYOUT_LIMIT = 60
+
+DEFAULT_ITERATIONS = 2000
+
+# MinimaxAgent settings MCTSAgent accepts and ignores, so make_agent and
+# self-play configs can switch algorithm without editing the rest
+IGNORED_OPTIONS = frozenset(["depth", "tablebase", "tt_size", "book"])
+
+# Root-parallel workers search in slices this long, so a stop request is
+# noticed between slices; without a deadline a slice is this many iterations
+# instead (about as long), so seeded searches repeat exactly
+SLICE_SECONDS = 0.05
+SLICE_ITERATIONS = 200
+
+
+class Node:
+    """
+    One position in the search tree. wins counts results for the player who
+    made move, from the parent's position, so the parent picks its best child
+    by the child's own win rate.
+    """
+    __slots__ = ("key", "move", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, board, move=None, parent=None):
+        self.key = board.key()
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = legal_moves(board, neutral_optional=True)
+        self.visits = 0
+        self.wins = 0.0
+
+    def select_child(self, exploration):
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits
+                   + exploration * math.sqrt(log_visits / child.visits))
+
+    def find(self, key, depth=2):
+        """
+        The descendant within depth plies whose position has key, or None
+        """
+        if self.key == key:
+            return self
+        if depth == 0:
+            return None
+        for child in self.children:
+            found = child.find(key, depth - 1)
+            if found is not None:
+                return found
+        return None
+
+
+def playout(board, rng, guided=True, limit=PLAYOUT_LIMIT):
+    """
+    Plays random moves from board and returns the side that won, or None for a
+    draw. Guided playouts take a winning L move whenever one exists.
+    """
+    for _ in range(limit):
+        own = board.own()
+        opponent = board.opponent()
+        neutrals = board.neutrals
+        targets = [mask for mask in DESTINATION_MASKS[own] if not mask & (opponent | neutrals)]
+        if not targets:
+            return board.side ^ 1
+        l_mask = None
+        if guided:
+            for mask in targets:
+                if not has_l_move(opponent, mask | neutrals):
+                    l_mask = mask
+                    break
+        if l_mask is None:
+            l_mask = rng.choice(targets)
+        # Like the full move list: any neutral to any free square, or no neutral move
+        neutral_from = neutral_to = 0
+        free_bits = split_bits(~(l_mask | opponent | neutrals) & FULL_MASK)
+        choice = rng.randrange(2 * len(free_bits) + 1)
+        if choice < 2 * len(free_bits):
+            neutral_from = split_bits(neutrals)[choice & 1]
+            neutral_to = free_bits[choice >> 1]
+        board = board.successor(l_mask, neutral_from, neutral_to)
+    return None
+
+
+class MCTSAgent:
+    """
+    UCT search with a time or iteration budget. The tree is kept between calls,
+    so when the next position is a grandchild of the last root (our move and
+    the opponent's reply), the statistics gathered under it carry over. With
+    workers > 1 each worker process grows its own tree from the same root and
+    the root visit counts are summed.
+    """
+    def __init__(self, iterations=None, time_limit=None, exploration=1.4, playout_limit=PLAYOUT_LIMIT,
+                 guided=True, workers=1, seed=None, verbose=True, stats_path=None, node_limit=None, **options):
+        unknown = sorted(set(options) - IGNORED_OPTIONS)
+        if unknown:
+            raise TypeError("MCTSAgent got unexpected options: %s" % ", ".join(unknown))
+        # node_limit is MinimaxAgent's name for the per-move budget
+        self.iterations = node_limit if iterations is None else iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.playout_limit = playout_limit
+        self.guided = guided
+        self.workers = workers
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.verbose = verbose
+        self.stats = SearchStats()
+        self.stats_path = stats_path
+        self.root = None
+        # One single-process pool per worker, so each tree stays in one process
+        self.executors = None
+        self.nodes_expanded = 0
+        self.completed_depth = 0
+
+    def getAction(self, gameState, time_limit=None, node_limit=None, stop_event=None):
+        """
+        Runs UCT iterations from gameState until the budget is spent and plays
+        the most visited move. node_limit caps the iterations.
+        """
+        started = time.time()
+        self.stats = stats = SearchStats()
+        stats.source = "mcts"
+        time_limit = self.time_limit if time_limit is None else time_limit
+        iterations = self.iterations if node_limit is None else node_limit
+        if iterations is None and time_limit is None:
+            iterations = DEFAULT_ITERATIONS
+        deadline = started + time_limit if time_limit is not None else None
+        board = gameState.toBitboard()
+
+        if self.workers > 1:
+            visits = self.searchParallel(board, iterations, deadline, stop_event)
+        else:
+            visits = self.search(board, iterations, deadline, stop_event)
+        move = None
+        if visits:
+            code = max(visits, key=lambda code: (visits[code][0], -code))
+            move = move_notation(unpack_move(code))
+            stats.score = visits[code][1] / visits[code][0]
+        stats.move = move
+        stats.nodes = self.nodes_expanded
+        stats.leaf_evaluations = self.nodes_expanded
+        stats.seconds = time.time() - started
+        if self.verbose:
+            print(f"Playouts: {self.nodes_expanded}")
+        if self.stats_path is not None:
+            stats.write_json_line(self.stats_path)
+        return move
+
+    def search(self, board, iterations, deadline, stop_event=None):
+        """
+        Grows the tree from board and returns {pack_move code: (visits, wins)}
+        for the root's children
+        """
+        root = self.root.find(board.key()) if self.root is not None else None
+        if root is None:
+            root = Node(board)
+        root.parent = None
+        root.move = None
+        self.root = root
+        self.nodes_expanded = 0
+
+        exploration = self.exploration
+        rng = self.rng
+        while iterations is None or self.nodes_expanded < iterations:
+            # The clock is comparatively slow to read, so check it every 16 iterations
+            if self.nodes_expanded % 16 == 0:
+                if deadline is not None and time.time() >= deadline:
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    break
+            node = root
+            position = board
+            # Selection
+            while not node.untried and node.children:
+                node = node.select_child(exploration)
+                placement, neutral_from, neutral_to = node.move
+                position = position.successor(placement.mask, neutral_from, neutral_to)
+            # Expansion
+            if node.untried:
+                move = node.untried.pop(rng.randrange(len(node.untried)))
+                placement, neutral_from, neutral_to = move
+                position = position.successor(placement.mask, neutral_from, neutral_to)
+                child = Node(position, move, node)
+                node.children.append(child)
+                node = child
+            # Simulation
+            winner = playout(position, rng, self.guided, self.playout_limit)
+            # Backpropagation; the player who moved into a node is the side not to move there
+            side = position.side
+            while node is not None:
+                node.visits += 1
+                if winner is None:
+                    node.wins += 0.5
+                elif winner != side:
+                    node.wins += 1
+                side ^= 1
+                node = node.parent
+            self.nodes_expanded += 1
+        return {pack_move(child.move): (child.visits, child.wins) for child in root.children if child.visits}
+
+    def searchParallel(self, board, iterations, deadline, stop_event=None):
+        """
+        Root parallelism: every worker searches board on its own and the root
+        statistics are added up. Work is handed out in slices of at most
+        SLICE_SECONDS, or SLICE_ITERATIONS without a deadline; each worker
+        keeps growing its tree across slices, and stop_event is checked
+        between them.
+        """
+        if self.executors is None:
+            self.executors = [ProcessPoolExecutor(1, initializer=_initMCTSWorker,
+                                                  initargs=(self.exploration, self.playout_limit, self.guided,
+                                                            self.seed, ordinal))
+                              for ordinal in range(self.workers)]
+        # Root statistics of each worker's tree, as of its latest slice
+        trees = [{} for _ in self.executors]
+        self.nodes_expanded = 0
+        playouts = 0
+        try:
+            while iterations is None or playouts < iterations:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                now = time.time()
+                if deadline is not None and now >= deadline:
+                    break
+                if deadline is None:
+                    slice_deadline = None
+                    share = SLICE_ITERATIONS
+                else:
+                    slice_deadline = min(deadline, now + SLICE_SECONDS)
+                    share = None
+                if iterations is not None:
+                    remaining = -(-(iterations - playouts) // self.workers)
+                    share = remaining if share is None else min(share, remaining)
+                futures = [executor.submit(_searchWorker, board.key(), share, slice_deadline)
+                           for executor in self.executors]
+                for ordinal, future in enumerate(futures):
+                    visits, count = future.result()
+                    trees[ordinal] = visits
+                    playouts += count
+        except BrokenProcessPool:
+            self.close()
+            return self.search(board, iterations, deadline, stop_event)
+        self.nodes_expanded = playouts
+        totals = {}
+        for visits in trees:
+            for code, (count, wins) in visits.items():
+                old_count, old_wins = totals.get(code, (0, 0.0))
+                totals[code] = (old_count + count, old_wins + wins)
+        return totals
+
+    def close(self):
+        if self.executors is not None:
+            for executor in self.executors:
+                executor.shutdown(cancel_futures=True)
+            self.executors = None
+
+
+# Agent owned by each root-parallel worker process; its tree is reused when
+# the same process gets the next move
+_worker_agent = None
+
+
+def _initMCTSWorker(exploration, playout_limit, guided, seed, ordinal):
+    global _worker_agent
+    # Each worker needs its own random stream or they would all grow the same tree;
+    # deriving it from the worker's number keeps seeded runs repeatable
+    worker_seed = None if seed is None else seed * 1000003 + ordinal
+    _worker_agent = MCTSAgent(exploration=exploration, playout_limit=playout_limit, guided=guided,
+                              seed=worker_seed, verbose=False)
+
+
+def _searchWorker(position_key, iterations, deadline):
+    agent = _worker_agent
+    visits = agent.search(Bitboard.from_key(position_key), iterations, deadline)
+    return visits, agent.nodes_expanded
@@ -0,0 +1,216 @@
+# movegen.py stores the precomputed L placement tables and bitboard move generation
+
+from collections import namedtuple
+from functools import lru_cache
+
+from .bitboard import BIT_SQUARES, BOARD_SIZE, FULL_MASK, SQUARE_BITS, positions_to_mask
+
+ORIENTATIONS = ['N', 'S', 'E', 'W']
+
+# A single L placement: its index in L_PLACEMENTS, the (x, y, orientation)
+# notation used by moves, the squares it covers and their mask
+Placement = namedtuple("Placement", ["index", "notation", "positions", "mask"])
+
+
+def generate_l_shape(x, y, orientation):
+    positions = []
+    if orientation == 'N':  # Vertical arm up
+        if x >= 3:  # Flip the piece if it's near the bottom edge
+            positions = [(x, y), (x, y - 1), (x - 1, y), (x - 2, y)]  # Flip upward
+        else:
+            #print("Standard L-piece facing North at ({}, {})".format(x, y))
+            positions = [(x, y), (x, y - 1), (x + 1, y), (x + 2, y)]
+
+    elif orientation == 'S':  # Vertical arm down
+        if x <= 2:  # Flip the piece if it's near the top edge
+            #print("Flipping L-piece facing South near the top edge at ({}, {})".format(x, y))
+            positions = [(x, y), (x, y + 1), (x + 1, y), (x + 2, y)]  # Flip downward
+        else:
+            #("Standard L-piece facing South at ({}, {})".format(x, y))
+            positions = [(x, y), (x, y + 1), (x - 1, y), (x - 2, y)]
+
+    elif orientation == 'E':  # Horizontal arm right
+        if y <= 2:  # Flip the piece if it's near the left edge
+            #print("Flipping L-piece facing East near the left edge at ({}, {})".format(x, y))
+            positions = [(x, y), (x + 1, y), (x, y + 1), (x, y + 2)]  # Flip rightward
+        else:
+            #print("Standard L-piece facing East at ({}, {})".format(x, y))
+            positions = [(x, y), (x + 1, y), (x, y - 1), (x, y - 2)]
+
+    elif orientation == 'W':  # Horizontal arm left
+        if y >= 3:  # Flip the piece if it's near the right edge
+            #print("Flipping L-piece facing West near the right edge at ({}, {})".format(x, y))
+            positions = [(x, y), (x - 1, y), (x, y - 1), (x, y - 2)]  # Flip leftward
+        else:
+            #print("Standard L-piece facing West at ({}, {})".format(x, y))
+            positions = [(x, y), (x, y + 1), (x, y + 2), (x - 1, y)]
+
+    else:
+        raise ValueError(f"Invalid orientation: {orientation}")
+    # Debug: Print the generated positions
+    #print("Generated positions for orientation {} at ({}, {}): {}".format(orientation, x, y, positions))
+    return positions
+
+
+def is_space_empty(new_positions, other_positions, neutral_positions):
+    new_pos_set = set(new_positions)
+    other_pos_set = set(other_positions)
+    neutral_pos_set = set(neutral_positions)
+    
+    # Check bounds first
+    if not all(1 <= pos[0] <= 4 and 1 <= pos[1] <= 4 for pos in new_pos_set):
+        return False
+    
+    # Use set operations for faster checking
+    return not (new_pos_set.intersection(other_pos_set) or 
+               new_pos_set.intersection(neutral_pos_set))
+
+
+def _build_placements():
+    """
+    Enumerates every in-bounds L placement once, in the same x, y, orientation
+    order the old per-call scan used
+    """
+    placements = []
+    seen = set()
+    for x in range(1, BOARD_SIZE + 1):
+        for y in range(1, BOARD_SIZE + 1):
+            for orientation in ORIENTATIONS:
+                positions = generate_l_shape(x, y, orientation)
+                if not all(1 <= pos[0] <= BOARD_SIZE and 1 <= pos[1] <= BOARD_SIZE for pos in positions):
+                    continue
+                mask = positions_to_mask(positions)
+                if mask in seen:
+                    continue
+                seen.add(mask)
+                placements.append(Placement(len(placements), (x, y, orientation), tuple(positions), mask))
+    return tuple(placements)
+
+
+L_PLACEMENTS = _build_placements()
+L_MASKS = tuple(placement.mask for placement in L_PLACEMENTS)
+PLACEMENT_BY_MASK = {placement.mask: placement for placement in L_PLACEMENTS}
+PLACEMENT_BY_NOTATION = {placement.notation: placement for placement in L_PLACEMENTS}
+
+# DESTINATIONS[i] holds every placement an L standing on placement i could move to
+DESTINATIONS = tuple(
+    tuple(other for other in L_PLACEMENTS if other.index != placement.index)
+    for placement in L_PLACEMENTS
+)
+DESTINATION_MASKS = {
+    placement.mask: tuple(other.mask for other in DESTINATIONS[placement.index])
+    for placement in L_PLACEMENTS
+}
+
+# An L move never covers a neutral, so it always leaves 16 - 4 - 4 - 2 empty
+# squares and each of the two neutrals can move to any of them
+NEUTRAL_MOVES_PER_L_MOVE = 2 * (BOARD_SIZE * BOARD_SIZE - 10)
+
+
+def split_bits(mask):
+    """
+    Returns the single-bit masks set in mask, lowest first
+    """
+    bits = []
+    while mask:
+        bit = mask & -mask
+        bits.append(bit)
+        mask ^= bit
+    return bits
+
+
+def legal_l_placements(own_mask, blockers):
+    """
+    Placements the L on own_mask can move to without touching blockers
+    """
+    return [placement for placement in DESTINATIONS[PLACEMENT_BY_MASK[own_mask].index]
+            if not placement.mask & blockers]
+
+
+@lru_cache(maxsize=1 << 16)
+def l_move_count(own_mask, blockers):
+    """
+    Number of placements the L on own_mask can move to, without building them
+    """
+    count = 0
+    for mask in DESTINATION_MASKS[own_mask]:
+        if not mask & blockers:
+            count += 1
+    return count
+
+
+def has_l_move(own_mask, blockers):
+    for mask in DESTINATION_MASKS[own_mask]:
+        if not mask & blockers:
+            return True
+    return False
+
+
+def count_legal_moves(board, neutral_optional=False):
+    """
+    Number of moves legal_moves would generate for the side to move
+    """
+    per_l_move = NEUTRAL_MOVES_PER_L_MOVE + 1 if neutral_optional else NEUTRAL_MOVES_PER_L_MOVE
+    return per_l_move * l_move_count(board.own(), board.l_blockers())
+
+
+def legal_moves(board, neutral_optional=False):
+    """
+    Generates (placement, neutral_from, neutral_to) moves for the side to move.
+    Neutral squares are single-bit masks; with neutral_optional the L-only move
+    is included as (placement, 0, 0)
+    """
+    opponent = board.opponent()
+    neutrals = board.neutrals
+    neutral_bits = split_bits(neutrals)
+    moves = []
+    for placement in legal_l_placements(board.own(), opponent | neutrals):
+        if neutral_optional:
+            moves.append((placement, 0, 0))
+        free_bits = split_bits(~(placement.mask | opponent | neutrals) & FULL_MASK)
+        for neutral_from in neutral_bits:
+            for neutral_to in free_bits:
+                moves.append((placement, neutral_from, neutral_to))
+    return moves
+
+
+def move_notation(move):
+    """
+    Converts a (placement, neutral_from, neutral_to) move into the
+    (x, y, orientation, neutral_move) form used by GameState and LGame
+    """
+    placement, neutral_from, neutral_to = move
+    neutral_move = (BIT_SQUARES[neutral_from], BIT_SQUARES[neutral_to]) if neutral_from else None
+    return placement.notation + (neutral_move,)
+
+
+def notation_to_move(move):
+    """
+    Inverse of move_notation; raises KeyError for an L that is not on the board
+    """
+    x, y, orientation, neutral_move = move
+    placement = PLACEMENT_BY_NOTATION[(x, y, orientation)]
+    if neutral_move is None:
+        return placement, 0, 0
+    old_pos, new_pos = neutral_move
+    return placement, SQUARE_BITS[old_pos], SQUARE_BITS[new_pos]
+
+
+def pack_move(move):
+    """
+    Packs a (placement, neutral_from, neutral_to) move into 15 bits: the
+    placement index, then the neutral's from and to square indices and a flag
+    set when a neutral moves
+    """
+    placement, neutral_from, neutral_to = move
+    if not neutral_from:
+        return placement.index
+    return (placement.index | (neutral_from.bit_length() - 1) << 6
+            | (neutral_to.bit_length() - 1) << 10 | 1 << 14)
+
+
+def unpack_move(code):
+    placement = L_PLACEMENTS[code & 63]
+    if not code >> 14 & 1:
+        return placement, 0, 0
+    return placement, 1 << (code >> 6 & 15), 1 << (code >> 10 & 15)
@@ -0,0 +1,64 @@
+# ordering.py stores the move ordering heuristics used by the alpha-beta search
+
+import random
+
+from .movegen import l_move_count
+
+
+class MoveOrderer:
+    """
+    Orders (placement, neutral_from, neutral_to) moves so the likeliest cutoffs
+    come first: the transposition-table move, then killer moves for the ply,
+    then moves by history score, then moves leaving the opponent the fewest L
+    moves. Without a seed, remaining ties keep generation order so searches
+    are reproducible.
+    """
+    def __init__(self, seed=None, killer_slots=2):
+        self.rng = random.Random(seed) if seed is not None else None
+        # The root gets its own stream so its order does not depend on how many interior nodes were searched
+        self.root_rng = random.Random(seed) if seed is not None else None
+        self.killer_slots = killer_slots
+        self.killers = {}
+        self.history = {}
+
+    def new_search(self):
+        """
+        Killers only make sense within one search; history is halved so
+        older searches count for less
+        """
+        self.killers = {}
+        self.history = {move: score // 2 for move, score in self.history.items() if score > 1}
+
+    def order(self, moves, board, ply, tt_move=None, static_only=False):
+        """
+        With static_only, killers and history are ignored so the order depends
+        only on the position and tt_move; the root uses this so every search
+        process orders root moves identically
+        """
+        opponent = board.opponent()
+        neutrals = board.neutrals
+        killers = () if static_only else self.killers.get(ply, ())
+        history = {} if static_only else self.history
+        rng = self.root_rng if static_only else self.rng
+
+        def sort_key(move):
+            if move == tt_move:
+                return (0, 0, 0, 0, 0)
+            if move in killers:
+                return (1, killers.index(move), 0, 0, 0)
+            placement, neutral_from, neutral_to = move
+            blockers = placement.mask | neutrals ^ neutral_from | neutral_to
+            opponent_mobility = l_move_count(opponent, blockers)
+            return (2, 0, -history.get(move, 0), opponent_mobility, rng.random() if rng else 0)
+
+        return sorted(moves, key=sort_key)
+
+    def record_cutoff(self, move, ply, depth):
+        """
+        Remembers a move that caused a beta cutoff at ply
+        """
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.killer_slots:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
@@ -0,0 +1,187 @@
+# perft.py stores the perft leaf counter used to check move generators and time them
+#
+# Usage: python -m lgame.perft --depth 3 [--state "3 1 W 1 1 4 4 2 4 E"] [--divide] [--check geometry]
+
+import argparse
+import time
+
+from .bitboard import BIT_SQUARES, SQUARES, positions_to_mask
+from .engine import DEFAULT_STATE, GameState, MinimaxAgent, parse_game_state
+from .movegen import (ORIENTATIONS, count_legal_moves, generate_l_shape, is_space_empty, legal_moves,
+                      move_notation)
+
+
+def perft(board, depth, neutral_optional=True, bulk=True):
+    """
+    Number of positions reached after exactly depth moves from board. With
+    bulk, the last ply is counted from the move count instead of being generated.
+    """
+    if depth == 0:
+        return 1
+    if bulk and depth == 1:
+        return count_legal_moves(board, neutral_optional)
+    nodes = 0
+    for placement, neutral_from, neutral_to in legal_moves(board, neutral_optional):
+        nodes += perft(board.successor(placement.mask, neutral_from, neutral_to), depth - 1,
+                       neutral_optional, bulk)
+    return nodes
+
+
+def divide(board, depth, neutral_optional=True, bulk=True):
+    """
+    perft broken down by root move; returns {(x, y, orientation, neutral_move): nodes}
+    """
+    counts = {}
+    for move in legal_moves(board, neutral_optional):
+        placement, neutral_from, neutral_to = move
+        child = board.successor(placement.mask, neutral_from, neutral_to)
+        counts[move_notation(move)] = perft(child, depth - 1, neutral_optional, bulk)
+    return counts
+
+
+def bitboard_moves(board, neutral_optional=True):
+    """
+    Moves from the table-driven generator as a set of (l_mask, neutral_from, neutral_to)
+    """
+    return {(placement.mask, neutral_from, neutral_to)
+            for placement, neutral_from, neutral_to in legal_moves(board, neutral_optional)}
+
+
+def geometry_moves(board, neutral_optional=True):
+    """
+    Slow reference generator that applies the rules square by square from
+    generate_l_shape, the way LGame.update_game_state validates a typed move
+    """
+    player_positions, dot_positions, current_player = board.to_positions()
+    other_player = "player2" if current_player == "player1" else "player1"
+    own = set(player_positions[current_player])
+    other = player_positions[other_player]
+    moves = set()
+    for x in range(1, 5):
+        for y in range(1, 5):
+            for orientation in ORIENTATIONS:
+                new_positions = generate_l_shape(x, y, orientation)
+                # The L has to end up somewhere other than where it started
+                if set(new_positions) == own or not is_space_empty(new_positions, other, dot_positions):
+                    continue
+                l_mask = positions_to_mask(new_positions)
+                if neutral_optional:
+                    moves.add((l_mask, 0, 0))
+                for from_pos in dot_positions:
+                    for to_pos in SQUARES:
+                        if to_pos in new_positions or to_pos in other or to_pos in dot_positions:
+                            continue
+                        moves.add((l_mask, positions_to_mask([from_pos]), positions_to_mask([to_pos])))
+    return moves
+
+
+def agent_moves(board, neutral_optional=True):
+    """
+    Moves from GameState.getLegalMoves (L only) and
+    MinimaxAgent.getLegalMovesWithNeutral (L plus neutral)
+    """
+    state = GameState.fromBitboard(board)
+    agent = MinimaxAgent(depth=1, tt_size=1, verbose=False)
+    moves = set()
+    for notation, (from_pos, to_pos) in agent.getLegalMovesWithNeutral(state):
+        moves.add((positions_to_mask(generate_l_shape(*notation)),
+                   positions_to_mask([from_pos]), positions_to_mask([to_pos])))
+    if neutral_optional:
+        for notation in state.getLegalMoves(board.side):
+            moves.add((positions_to_mask(generate_l_shape(*notation)), 0, 0))
+    return moves
+
+
+GENERATORS = {
+    "bitboard": bitboard_moves,
+    "geometry": geometry_moves,
+    "agent": agent_moves,
+}
+
+
+def cross_check(board, depth, generator, reference, neutral_optional=True, limit=10):
+    """
+    Walks every position up to depth plies from board and compares the move
+    sets of two GENERATORS entries. Returns up to limit (board, missing,
+    extra) mismatches, where missing moves are only in reference.
+    """
+    generate = GENERATORS[generator]
+    expected = GENERATORS[reference]
+    mismatches = []
+    seen = set()
+    frontier = [board]
+    for ply in range(depth + 1):
+        next_frontier = []
+        for position in frontier:
+            key = position.key()
+            if key in seen:
+                continue
+            seen.add(key)
+            moves = generate(position, neutral_optional)
+            reference_moves = expected(position, neutral_optional)
+            if moves != reference_moves:
+                mismatches.append((position, reference_moves - moves, moves - reference_moves))
+                if len(mismatches) >= limit:
+                    return mismatches
+            if ply < depth:
+                next_frontier.extend(position.successor(l_mask, neutral_from, neutral_to)
+                                     for l_mask, neutral_from, neutral_to in reference_moves)
+        frontier = next_frontier
+    return mismatches
+
+
+def _format_move(move):
+    l_mask, neutral_from, neutral_to = move
+    squares = [BIT_SQUARES[1 << i] for i in range(16) if l_mask >> i & 1]
+    if neutral_from:
+        return "L %s, neutral %s -> %s" % (squares, BIT_SQUARES[neutral_from], BIT_SQUARES[neutral_to])
+    return "L %s" % squares
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count move-generation leaves from a position")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--state", default=DEFAULT_STATE, help="start state, default '%(default)s'")
+    parser.add_argument("--player", default="player1", choices=["player1", "player2"], help="side to move")
+    parser.add_argument("--mandatory-neutral", action="store_true",
+                        help="count only moves that also move a neutral piece")
+    parser.add_argument("--no-bulk", action="store_true", help="generate the last ply instead of counting it")
+    parser.add_argument("--divide", action="store_true", help="break the count down by root move")
+    parser.add_argument("--check", default=None, choices=sorted(GENERATORS),
+                        help="compare the bitboard generator against another one at every node up to --depth")
+    args = parser.parse_args()
+
+    board = parse_game_state(args.state, args.player).toBitboard()
+    neutral_optional = not args.mandatory_neutral
+    bulk = not args.no_bulk
+
+    if args.check:
+        started = time.perf_counter()
+        mismatches = cross_check(board, args.depth, "bitboard", args.check, neutral_optional)
+        elapsed = time.perf_counter() - started
+        for position, missing, extra in mismatches:
+            print("Mismatch at %r" % (position,))
+            for move in sorted(missing):
+                print("  only in %s: %s" % (args.check, _format_move(move)))
+            for move in sorted(extra):
+                print("  only in bitboard: %s" % _format_move(move))
+        print("Cross-check against %s to depth %d: %s (%.2fs)" % (
+            args.check, args.depth, "%d mismatches" % len(mismatches) if mismatches else "ok", elapsed))
+        return
+
+    for depth in range(1, args.depth + 1):
+        started = time.perf_counter()
+        if args.divide and depth == args.depth:
+            counts = divide(board, depth, neutral_optional, bulk)
+            for move in sorted(counts, key=str):
+                print("  %s: %d" % (move, counts[move]))
+            nodes = sum(counts.values())
+        else:
+            nodes = perft(board, depth, neutral_optional, bulk)
+        elapsed = time.perf_counter() - started
+        print("perft(%d) = %d in %.3fs, %.0f leaves/s" % (
+            depth, nodes, elapsed, nodes / elapsed if elapsed else 0.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+# records.py stores the game record formats: a text form, a packed binary form,
+# a streaming writer and an indexed reader
+#
+# A text record is one line per game:
+#     player1 | 3 1 W 1 1 4 4 2 4 E | 4 1 W 4 4 1 2; 2 4 E | player1
+# the side to move first, the start state in parse_game_state's form, the moves
+# in LGame's "x y D [ox oy nx ny]" input form and the result.
+#
+# A binary file starts with a header, and each game is the packed start key
+# (8 bytes), one pack_move code per ply (2 bytes) and an end code carrying the
+# result. Codes never set bit 15, so the end code is unambiguous.
+#
+# Both writers keep a sidecar index, <path>.idx, holding the byte offset of
+# every finished game as a uint64, so a reader reaches game N without parsing
+# the games before it. A game cut short by a crash is never indexed.
+#
+# Usage: python -m lgame.records [--index] [--game N] [--ply K] path
+
+import argparse
+import mmap
+import os
+import struct
+from array import array
+from collections import namedtuple
+
+from .bitboard import BIT_SQUARES, PLAYERS, Bitboard
+from .engine import parse_game_state
+from .movegen import PLACEMENT_BY_MASK, move_notation, notation_to_move, pack_move, split_bits, unpack_move
+
+MAGIC = b"LGGR"
+VERSION = 1
+# magic, version
+HEADER = struct.Struct("<4sH")
+START = struct.Struct("<Q")
+CODE = struct.Struct("<H")
+END_FLAG = 1 << 15
+
+RESULTS = ("player1", "player2", "draw", "*")
+
+# Binary records are written for paths with this extension, text for anything else
+BINARY_EXTENSION = ".lgr"
+
+# A finished game: its start as a Bitboard, its (placement, neutral_from,
+# neutral_to) moves and one of RESULTS
+GameRecord = namedtuple("GameRecord", ["start", "moves", "result"])
+
+
+def result_name(winner):
+    """
+    RESULTS entry for a winning player index, None meaning a draw
+    """
+    return "draw" if winner is None else PLAYERS[winner]
+
+
+def format_move(move):
+    """
+    Writes a (placement, neutral_from, neutral_to) move as "x y D" or "x y D ox oy nx ny"
+    """
+    x, y, orientation, neutral_move = move_notation(move)
+    if neutral_move is None:
+        return "%d %d %s" % (x, y, orientation)
+    (old_x, old_y), (new_x, new_y) = neutral_move
+    return "%d %d %s %d %d %d %d" % (x, y, orientation, old_x, old_y, new_x, new_y)
+
+
+def parse_move(text):
+    """
+    Inverse of format_move; raises ValueError for malformed text
+    """
+    tokens = text.split()
+    if len(tokens) not in (3, 7):
+        raise ValueError("Invalid move %r: expected 'x y D' or 'x y D ox oy nx ny'" % text)
+    try:
+        x, y = int(tokens[0]), int(tokens[1])
+        neutral_move = None
+        if len(tokens) == 7:
+            old_x, old_y, new_x, new_y = map(int, tokens[3:])
+            neutral_move = ((old_x, old_y), (new_x, new_y))
+        return notation_to_move((x, y, tokens[2].upper(), neutral_move))
+    except (KeyError, ValueError):
+        raise ValueError("Invalid move %r" % text)
+
+
+def format_state(board):
+    """
+    The 'P1(x y D) n1x n1y n2x n2y P2(x y D)' string parse_game_state reads
+    """
+    neutrals = [BIT_SQUARES[bit] for bit in split_bits(board.neutrals)]
+    tokens = list(PLACEMENT_BY_MASK[board.player1].notation)
+    tokens += [coordinate for square in neutrals for coordinate in square]
+    tokens += PLACEMENT_BY_MASK[board.player2].notation
+    return " ".join(str(token) for token in tokens)
+
+
+def format_record(record):
+    moves = "; ".join(format_move(move) for move in record.moves)
+    return "%s | %s | %s | %s" % (PLAYERS[record.start.side], format_state(record.start), moves, record.result)
+
+
+def parse_record(line):
+    """
+    Reads one text record line into a GameRecord
+    """
+    fields = [field.strip() for field in line.split("|")]
+    if len(fields) != 4 or fields[0] not in PLAYERS or fields[3] not in RESULTS:
+        raise ValueError("Invalid game record %r" % line.strip())
+    start = parse_game_state(fields[1], fields[0]).toBitboard()
+    moves = [parse_move(move) for move in fields[2].split(";") if move.strip()]
+    return GameRecord(start, moves, fields[3])
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+class GameRecordWriter:
+    """
+    Appends games to a record file one move at a time, so a long batch run
+    never holds a whole game in memory. Text or binary follows the path's
+    extension unless binary is given.
+    """
+    def __init__(self, path, binary=None):
+        self.path = path
+        self.binary = path.endswith(BINARY_EXTENSION) if binary is None else binary
+        existing = os.path.exists(path) and os.path.getsize(path) > 0
+        if existing:
+            self.binary = _trim_unfinished(path)
+        self.data = open(path, "ab")
+        if self.binary and self.data.tell() == 0:
+            self.data.write(HEADER.pack(MAGIC, VERSION))
+        # An index left over from a removed or emptied data file must not be appended to
+        self.index = open(index_path(path), "ab" if existing else "wb")
+        self.offset = None
+        self.moves = 0
+
+    def begin_game(self, start):
+        """
+        Starts a game from the Bitboard start
+        """
+        if self.offset is not None:
+            raise ValueError("Previous game was not ended")
+        self.offset = self.data.tell()
+        self.moves = 0
+        if self.binary:
+            self.data.write(START.pack(start.key()))
+        else:
+            self.data.write(("%s | %s | " % (PLAYERS[start.side], format_state(start))).encode())
+
+    def write_move(self, move):
+        if self.offset is None:
+            raise ValueError("No game has been begun")
+        if self.binary:
+            self.data.write(CODE.pack(pack_move(move)))
+        else:
+            self.data.write(((self.moves and "; " or "") + format_move(move)).encode())
+        self.moves += 1
+
+    def end_game(self, result):
+        """
+        Writes the result and indexes the game; result is one of RESULTS
+        """
+        if self.offset is None:
+            raise ValueError("No game has been begun")
+        if result not in RESULTS:
+            raise ValueError("Unknown result %r" % result)
+        if self.binary:
+            self.data.write(CODE.pack(END_FLAG | RESULTS.index(result)))
+        else:
+            self.data.write((" | %s\n" % result).encode())
+        # The data must reach the file before the index points at it
+        self.data.flush()
+        self.index.write(START.pack(self.offset))
+        self.index.flush()
+        self.offset = None
+
+    def write_game(self, record):
+        self.begin_game(record.start)
+        for move in record.moves:
+            self.write_move(move)
+        self.end_game(record.result)
+
+    def close(self):
+        self.data.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _game_end(data, offset, binary):
+    """
+    Offset just past the game starting at offset, or None if it was never finished
+    """
+    if not binary:
+        end = data.find(b"\n", offset)
+        return None if end < 0 else end + 1
+    position = offset + START.size
+    while position + CODE.size <= len(data):
+        code = CODE.unpack_from(data, position)[0]
+        position += CODE.size
+        if code & END_FLAG:
+            return position
+    return None
+
+
+def _scan_offsets(data, binary):
+    """
+    Offsets of every complete game in a record file's bytes
+    """
+    offsets = array('Q')
+    position = HEADER.size if binary else 0
+    while position < len(data):
+        end = _game_end(data, position, binary)
+        if end is None:
+            break
+        offsets.append(position)
+        position = end
+    return offsets
+
+
+def _trim_unfinished(path):
+    """
+    Cuts a game left unfinished by an interrupted writer off the end of a
+    record file, so the next game starts cleanly. Returns whether it is binary.
+    """
+    if not os.path.exists(index_path(path)):
+        build_index(path)
+    with GameRecordReader(path) as reader:
+        binary = reader.binary
+        offsets = reader.offsets
+        end = HEADER.size if binary else 0
+        if offsets:
+            end = _game_end(reader.data, offsets[-1], binary)
+    if end < os.path.getsize(path):
+        os.truncate(path, end)
+    # The reader rescans when the index does not fit the file; keep what it found
+    if os.path.getsize(index_path(path)) != len(offsets) * offsets.itemsize:
+        with open(index_path(path), "wb") as f:
+            offsets.tofile(f)
+    return binary
+
+
+def build_index(path):
+    """
+    Rewrites the sidecar index of a record file by scanning it
+    """
+    with GameRecordReader(path, use_index=False) as reader:
+        offsets = reader.offsets
+    with open(index_path(path), "wb") as f:
+        offsets.tofile(f)
+    return len(offsets)
+
+
+class GameRecordReader:
+    """
+    Random access to the games of a text or binary record file. The file is
+    mapped rather than read; the sidecar index gives game offsets, and without
+    one the file is scanned once.
+    """
+    def __init__(self, path, use_index=True):
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.binary = self.data[:len(MAGIC)] == MAGIC
+        if self.binary:
+            version = HEADER.unpack_from(self.data, 0)[1]
+            if version != VERSION:
+                raise ValueError("%s is a version %d game record file, not %d" % (path, version, VERSION))
+        self.offsets = None
+        if use_index and os.path.exists(index_path(path)):
+            offsets = array('Q')
+            with open(index_path(path), "rb") as f:
+                offsets.frombytes(f.read())
+            if not offsets or offsets[-1] < size:
+                self.offsets = offsets
+        if self.offsets is None:
+            self.offsets = _scan_offsets(self.data, self.binary)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __iter__(self):
+        for number in range(len(self.offsets)):
+            yield self.game(number)
+
+    def game(self, number):
+        """
+        The GameRecord of game number (counting from 0)
+        """
+        offset = self.offsets[number]
+        if not self.binary:
+            end = self.data.find(b"\n", offset)
+            return parse_record(self.data[offset:end].decode())
+        start = Bitboard.from_key(START.unpack_from(self.data, offset)[0])
+        moves = []
+        position = offset + START.size
+        while True:
+            code = CODE.unpack_from(self.data, position)[0]
+            position += CODE.size
+            if code & END_FLAG:
+                return GameRecord(start, moves, RESULTS[code & 3])
+            moves.append(unpack_move(code))
+
+    def moves(self, number, plies):
+        """
+        The first plies moves of game number; binary records read only those
+        """
+        if not self.binary:
+            return self.game(number).moves[:plies]
+        position = self.offsets[number] + START.size
+        moves = []
+        for _ in range(plies):
+            code = CODE.unpack_from(self.data, position)[0]
+            if code & END_FLAG:
+                break
+            moves.append(unpack_move(code))
+            position += CODE.size
+        return moves
+
+    def position(self, number, ply):
+        """
+        The Bitboard after ply moves of game number; raises IndexError past the game's end
+        """
+        offset = self.offsets[number]
+        if self.binary:
+            board = Bitboard.from_key(START.unpack_from(self.data, offset)[0])
+        else:
+            board = self.game(number).start
+        moves = self.moves(number, ply)
+        if len(moves) < ply:
+            raise IndexError("Game %d has only %d plies" % (number, len(moves)))
+        for placement, neutral_from, neutral_to in moves:
+            board = board.successor(placement.mask, neutral_from, neutral_to)
+        return board
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index or inspect an L-game record file")
+    parser.add_argument("path")
+    parser.add_argument("--index", action="store_true", help="rebuild the sidecar index")
+    parser.add_argument("--game", type=int, default=None, help="print this game (counting from 0)")
+    parser.add_argument("--ply", type=int, default=None, help="with --game, print the position after this ply")
+    args = parser.parse_args()
+
+    if args.index:
+        print("Indexed %d games in %s" % (build_index(args.path), index_path(args.path)))
+    with GameRecordReader(args.path) as reader:
+        if args.game is None:
+            print("%s: %d games (%s)" % (args.path, len(reader), "binary" if reader.binary else "text"))
+        elif args.ply is None:
+            print(format_record(reader.game(args.game)))
+        else:
+            board = reader.position(args.game, args.ply)
+            print("%s, %s to move" % (format_state(board), PLAYERS[board.side]))
+
+
+if __name__ == "__main__":
+    main()
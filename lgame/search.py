@@ -0,0 +1,228 @@
+# search.py stores the negamax family of search agents: plain alpha-beta, principal
+# variation search and MTD(f), all sharing MinimaxAgent's interface
+#
+# Scores are finite and relative to the side to move, so one negamax routine
+# serves both players and null-window searches have a well-defined window.
+# A lost position scores -(WIN_SCORE - ply), so shorter wins score higher.
+
+from .bitboard import CENTRE_MASK, SQUARE_NEIGHBOURS, popcount
+from .engine import DRAW_SCORE, MinimaxAgent
+from .mcts import MCTSAgent
+from .movegen import has_l_move, l_move_count, legal_moves, split_bits
+from .transposition import EXACT, LOWER, PATH_DEPENDENT, UPPER
+
+WIN_SCORE = 100000
+# Scores beyond this are forced wins or losses
+DECIDED_SCORE = WIN_SCORE - 1000
+INFINITY = WIN_SCORE + 1
+
+
+def score_to_tt(score, ply):
+    """
+    Win and loss scores count plies from the root; the table stores them
+    counted from the node so they stay right wherever the node recurs
+    """
+    if score >= DECIDED_SCORE:
+        return score + ply
+    if score <= -DECIDED_SCORE:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    if score >= DECIDED_SCORE:
+        return score - ply
+    if score <= -DECIDED_SCORE:
+        return score + ply
+    return score
+
+
+class NegamaxAgent(MinimaxAgent):
+    """
+    Fail-soft negamax alpha-beta over a transposition table. Reuses
+    MinimaxAgent's iterative deepening, budgets, statistics, book and
+    tablebase; only the per-iteration search and the evaluation differ.
+    Root moves are never split across processes.
+    """
+    # Null-window re-searches after the first move
+    principal_variation_search = False
+    # Scores are relative to the side to move, so a draw is simply zero
+    draw_score = DRAW_SCORE
+
+    def __init__(self, depth='inf', **options):
+        options["workers"] = 1
+        super().__init__(depth, **options)
+
+    def searchIteration(self, state, depth, first_move):
+        return self.negamax(state, depth, -INFINITY, INFINITY, 0, first_move)
+
+    def isDecided(self, score):
+        return abs(score) >= DECIDED_SCORE
+
+    def ttKey(self, state, ply):
+        # Scores are relative to the side to move, so both players share entries
+        return state.hash
+
+    def negamax(self, state, depth, alpha, beta, ply, first_move=None):
+        """
+        Returns (score, move) for the side to move on a SearchState; the score is
+        exact inside (alpha, beta) and a bound on the true score outside it
+        """
+        if ply > 0 and state.hash in self.path_hashes:
+            self.stats.repetitions += 1
+            self.repetitions_seen += 1
+            return self.draw_score, None
+
+        alpha_orig = alpha
+        entry = self.tt.probe(state.hash)
+        tt_move = None
+        if entry is not None:
+            entry_depth, flag, entry_value, tt_move = entry
+            # The root always searches so it returns a move
+            if entry_depth >= depth and ply > 0 and flag != PATH_DEPENDENT:
+                entry_value = score_from_tt(entry_value, ply)
+                if flag == EXACT:
+                    self.stats.tt_cutoffs += 1
+                    return entry_value, tt_move
+                if flag == LOWER:
+                    alpha = max(alpha, entry_value)
+                else:
+                    beta = min(beta, entry_value)
+                if alpha >= beta:
+                    self.stats.tt_cutoffs += 1
+                    return entry_value, tt_move
+
+        self.nodes_expanded += 1
+        self.checkBudget()
+
+        own = state.own()
+        opponent = state.opponent()
+        if not has_l_move(own, opponent | state.neutrals):
+            score = -(WIN_SCORE - ply)
+            self.stats.leaf_evaluations += 1
+            self.tt.store(state.hash, depth, EXACT, score_to_tt(score, ply), None)
+            return score, None
+        if depth == 0 or ply >= self.MAX_SEARCH_DEPTH:
+            score = self.evaluateRelative(state)
+            self.stats.leaf_evaluations += 1
+            self.tt.store(state.hash, depth, EXACT, score, None)
+            return score, None
+
+        valid_moves = self.orderer.order(legal_moves(state), state, ply, first_move or tt_move,
+                                         static_only=ply == 0)
+        best_value = -INFINITY
+        best_move = None
+        repetitions_seen = self.repetitions_seen
+        # Saved because an aborted child search can leave state anywhere below this node
+        node_hash = state.hash
+        self.enterPath(node_hash)
+        try:
+            for i, move in enumerate(valid_moves):
+                undo_token = state.make_move(move)
+                try:
+                    if i == 0 or not self.principal_variation_search:
+                        value = -self.negamax(state, depth - 1, -beta, -alpha, ply + 1)[0]
+                    else:
+                        # Scores are integers, so (alpha, alpha + 1) only asks whether the move beats alpha
+                        value = -self.negamax(state, depth - 1, -alpha - 1, -alpha, ply + 1)[0]
+                        if alpha < value < beta:
+                            value = -self.negamax(state, depth - 1, -beta, -alpha, ply + 1)[0]
+                finally:
+                    state.unmake_move(undo_token)
+                if value > best_value:
+                    best_value = value
+                    best_move = move
+                if value > alpha:
+                    alpha = value
+                if alpha >= beta:
+                    self.orderer.record_cutoff(move, ply, depth)
+                    self.stats.record_cutoff(ply)
+                    break
+        finally:
+            self.leavePath(node_hash)
+
+        if self.repetitions_seen != repetitions_seen:
+            flag = PATH_DEPENDENT
+        elif best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(state.hash, depth, flag, score_to_tt(best_value, ply), best_move)
+        return best_value, best_move
+
+    def evaluateRelative(self, state):
+        """
+        Heuristic score for the side to move: L mobility, L pieces on the centre
+        squares and neutral pieces hemming in each L, each side's terms cancelling
+        the other's so that a position and its negation agree
+        """
+        own = state.own()
+        opponent = state.opponent()
+        neutrals = state.neutrals
+        score = 10 * (l_move_count(own, opponent | neutrals) - l_move_count(opponent, own | neutrals))
+        score += popcount(own & CENTRE_MASK) - popcount(opponent & CENTRE_MASK)
+        for dot_bit in split_bits(neutrals):
+            neighbours = SQUARE_NEIGHBOURS[dot_bit]
+            score += 2 * (popcount(neighbours & opponent) - popcount(neighbours & own))
+        return score
+
+
+class PVSAgent(NegamaxAgent):
+    """
+    Principal variation search: the first move gets the full window and the
+    rest a null window, re-searched only when they turn out better
+    """
+    principal_variation_search = True
+
+
+class MTDfAgent(NegamaxAgent):
+    """
+    MTD(f): each iteration closes in on the score with null-window negamax
+    searches, starting from the previous iteration's score. The table keeps
+    the bounds found by earlier passes, so each pass mostly re-reads them.
+    """
+    def __init__(self, depth='inf', **options):
+        super().__init__(depth, **options)
+        self.guess = 0
+
+    def getAction(self, gameState, time_limit=None, node_limit=None, stop_event=None):
+        self.guess = 0
+        return super().getAction(gameState, time_limit, node_limit, stop_event)
+
+    def searchIteration(self, state, depth, first_move):
+        score = self.guess
+        lower, upper = -INFINITY, INFINITY
+        best_move = first_move
+        while lower < upper:
+            beta = score + 1 if score == lower else score
+            score, move = self.negamax(state, depth, beta - 1, beta, 0, best_move)
+            if score < beta:
+                upper = score
+            else:
+                lower = score
+                # Only a pass that beats beta proves its move is the best one
+                best_move = move
+        self.guess = score
+        return score, best_move or move
+
+
+ALGORITHMS = {
+    "minimax": MinimaxAgent,
+    "negamax": NegamaxAgent,
+    "pvs": PVSAgent,
+    "mtdf": MTDfAgent,
+    "mcts": MCTSAgent,
+}
+
+
+def make_agent(algorithm="minimax", **options):
+    """
+    Builds the agent for an ALGORITHMS name with MinimaxAgent's keyword options.
+    MCTSAgent takes its own, accepts and ignores the MinimaxAgent-only ones in
+    mcts.IGNORED_OPTIONS and raises TypeError for anything else.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError("Unknown search algorithm %r; choose from %s" % (algorithm, ", ".join(sorted(ALGORITHMS))))
+    return ALGORITHMS[algorithm](**options)
@@ -0,0 +1,69 @@
+# searchstate.py stores the mutable position the search updates in place
+
+from .bitboard import Bitboard
+from .transposition import ZOBRIST_L, ZOBRIST_NEUTRAL, ZOBRIST_SIDE, zobrist_hash
+
+
+class SearchState:
+    """
+    Bitboard position that the search changes with make_move and restores
+    with unmake_move, keeping its Zobrist hash up to date. Offers the same
+    read interface as Bitboard, so move generation and evaluation accept either.
+    """
+    __slots__ = ("player1", "player2", "neutrals", "side", "hash")
+
+    def __init__(self, board):
+        self.player1 = board.player1
+        self.player2 = board.player2
+        self.neutrals = board.neutrals
+        self.side = board.side
+        self.hash = zobrist_hash(board)
+
+    def to_board(self):
+        return Bitboard(self.player1, self.player2, self.neutrals, self.side)
+
+    def key(self):
+        return self.player1 | self.player2 << 16 | self.neutrals << 32 | self.side << 48
+
+    def own(self):
+        return self.player2 if self.side else self.player1
+
+    def opponent(self):
+        return self.player1 if self.side else self.player2
+
+    def l_blockers(self):
+        return (self.player1 if self.side else self.player2) | self.neutrals
+
+    def make_move(self, move):
+        """
+        Plays a (placement, neutral_from, neutral_to) move for the side to move
+        and returns the token unmake_move needs to take it back
+        """
+        placement, neutral_from, neutral_to = move
+        side = self.side
+        undo_token = (self.player2 if side else self.player1, neutral_from, neutral_to, self.hash)
+        l_keys = ZOBRIST_L[side]
+        if side:
+            key = self.hash ^ l_keys[self.player2] ^ l_keys[placement.mask]
+            self.player2 = placement.mask
+        else:
+            key = self.hash ^ l_keys[self.player1] ^ l_keys[placement.mask]
+            self.player1 = placement.mask
+        if neutral_from:
+            self.neutrals = self.neutrals ^ neutral_from | neutral_to
+            key ^= ZOBRIST_NEUTRAL[neutral_from] ^ ZOBRIST_NEUTRAL[neutral_to]
+        self.side = side ^ 1
+        self.hash = key ^ ZOBRIST_SIDE
+        return undo_token
+
+    def unmake_move(self, undo_token):
+        old_l, neutral_from, neutral_to, old_hash = undo_token
+        side = self.side ^ 1
+        if side:
+            self.player2 = old_l
+        else:
+            self.player1 = old_l
+        if neutral_from:
+            self.neutrals = self.neutrals ^ neutral_to | neutral_from
+        self.side = side
+        self.hash = old_hash
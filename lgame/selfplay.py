@@ -0,0 +1,222 @@
+# selfplay.py stores the headless AI-vs-AI runner used to regression-test agents
+#
+# Usage: python -m lgame.selfplay --games 200 --workers 4 --agent1 depth=3 --agent2 depth=2 --random-start
+#        [--record games.lgr]
+
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .bitboard import FULL_MASK, PLAYERS, Bitboard
+from .engine import DEFAULT_STATE, GameState, parse_game_state
+from .history import DRAW_REPETITIONS
+from .movegen import L_PLACEMENTS, has_l_move, legal_moves, notation_to_move, pack_move, split_bits, unpack_move
+from .records import GameRecordWriter, format_state, result_name
+from .search import make_agent
+
+# Games still running after this many plies are scored as draws
+MAX_PLIES = 200
+
+
+def random_start(rng):
+    """
+    Random legal arrangement with player1 to move and at least one L move
+    """
+    while True:
+        first, second = rng.sample(L_PLACEMENTS, 2)
+        if first.mask & second.mask:
+            continue
+        neutral_1, neutral_2 = rng.sample(split_bits(~(first.mask | second.mask) & FULL_MASK), 2)
+        board = Bitboard(first.mask, second.mask, neutral_1 | neutral_2, 0)
+        if has_l_move(board.own(), board.l_blockers()):
+            return board
+
+
+def play_game(configs, start_key, max_plies=MAX_PLIES):
+    """
+    Plays one game between agents built from configs (player1's first) by make_agent.
+    A position occurring DRAW_REPETITIONS times ends the game as a draw, as does max_plies.
+    Returns the winning player index (None for a draw), the plies played,
+    each player's per-move search times and the moves as pack_move codes.
+    Raises ValueError when an agent plays an illegal move.
+    """
+    agents = [make_agent(**dict(config, verbose=False)) for config in configs]
+    board = Bitboard.from_key(start_key)
+    move_times = ([], [])
+    moves = []
+    history = []
+    occurrences = {}
+    winner = None
+    plies = 0
+    try:
+        while plies < max_plies:
+            side = board.side
+            if not has_l_move(board.own(), board.l_blockers()):
+                winner = side ^ 1
+                break
+            key = board.key()
+            occurrences[key] = occurrences.get(key, 0) + 1
+            if occurrences[key] >= DRAW_REPETITIONS:
+                break
+            started = time.perf_counter()
+            move = agents[side].getAction(GameState.fromBitboard(board, tuple(history)))
+            history.append(key)
+            move_times[side].append(time.perf_counter() - started)
+            if move is None:
+                winner = side ^ 1
+                break
+            try:
+                played = notation_to_move(move)
+            except (KeyError, TypeError, ValueError):
+                played = None
+            if played not in legal_moves(board, neutral_optional=True):
+                raise ValueError("Agent %r played the illegal move %r in %s with %s to move" % (
+                    configs[side], move, format_state(board), PLAYERS[side]))
+            placement, neutral_from, neutral_to = played
+            board = board.successor(placement.mask, neutral_from, neutral_to)
+            moves.append(pack_move((placement, neutral_from, neutral_to)))
+            plies += 1
+    finally:
+        for agent in agents:
+            agent.close()
+    return {"winner": winner, "plies": plies, "move_times": move_times, "start_key": start_key, "moves": moves}
+
+
+def _play_task(task):
+    configs, start_key, max_plies, swapped = task
+    result = play_game(configs, start_key, max_plies)
+    result["swapped"] = swapped
+    return result
+
+
+def record_game(writer, result):
+    """
+    Streams one play_game result to a GameRecordWriter and drops its moves,
+    so a long run does not keep every game in memory
+    """
+    writer.begin_game(Bitboard.from_key(result["start_key"]))
+    for code in result.pop("moves"):
+        writer.write_move(unpack_move(code))
+    writer.end_game(result_name(result["winner"]))
+
+
+def run_selfplay(config_a, config_b, games, workers=1, start=None, randomise=False, seed=None,
+                 max_plies=MAX_PLIES, swap_sides=True, record_path=None):
+    """
+    Plays games between agent A and agent B (dicts of make_agent arguments)
+    across a process pool and returns the per-game results. Starts from start
+    (a state string, DEFAULT_STATE when None) or from seeded random positions;
+    with swap_sides A plays player2 in every other game. With record_path each
+    game is appended to that record file (see records.py) as it finishes.
+    """
+    rng = random.Random(seed)
+    fixed_start = parse_game_state(start or DEFAULT_STATE).toBitboard()
+    tasks = []
+    for game in range(games):
+        board = random_start(rng) if randomise else fixed_start
+        swapped = swap_sides and game % 2 == 1
+        configs = (config_b, config_a) if swapped else (config_a, config_b)
+        tasks.append((configs, board.key(), max_plies, swapped))
+
+    writer = GameRecordWriter(record_path) if record_path else None
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        if executor:
+            games_played = executor.map(_play_task, tasks, chunksize=max(1, games // (workers * 4)))
+        else:
+            games_played = map(_play_task, tasks)
+        results = []
+        for result in games_played:
+            if writer:
+                record_game(writer, result)
+            results.append(result)
+        return results
+    finally:
+        if executor:
+            executor.shutdown()
+        if writer:
+            writer.close()
+
+
+def summarize(results):
+    """
+    Wins/losses/draws, game lengths and per-move times from agent A's side
+    """
+    summary = {"games": len(results), "a_wins": 0, "b_wins": 0, "draws": 0}
+    times = {"a": [], "b": []}
+    for result in results:
+        a_side = 1 if result["swapped"] else 0
+        if result["winner"] is None:
+            summary["draws"] += 1
+        elif result["winner"] == a_side:
+            summary["a_wins"] += 1
+        else:
+            summary["b_wins"] += 1
+        times["a"].extend(result["move_times"][a_side])
+        times["b"].extend(result["move_times"][a_side ^ 1])
+
+    lengths = [result["plies"] for result in results]
+    if lengths:
+        summary["plies_mean"] = sum(lengths) / len(lengths)
+        summary["plies_min"] = min(lengths)
+        summary["plies_max"] = max(lengths)
+    for name, samples in times.items():
+        if samples:
+            summary[name + "_move_time_mean"] = sum(samples) / len(samples)
+            summary[name + "_move_time_max"] = max(samples)
+    return summary
+
+
+def parse_agent_config(text):
+    """
+    Turns 'algorithm=pvs,depth=3,time_limit=0.05' into make_agent keyword arguments
+    """
+    config = {}
+    for item in filter(None, text.split(",")):
+        name, value = item.split("=", 1)
+        for convert in (int, float):
+            try:
+                value = convert(value)
+                break
+            except ValueError:
+                continue
+        config[name.strip()] = value
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play headless L-game matches between two agents")
+    parser.add_argument("--agent1", default="depth=3", help="agent A, e.g. algorithm=pvs,depth=3,time_limit=0.1")
+    parser.add_argument("--agent2", default="depth=2", help="agent B")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--start", default=None, help="start state, default '%s'" % DEFAULT_STATE)
+    parser.add_argument("--random-start", action="store_true", help="start each game from a random position")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES)
+    parser.add_argument("--no-swap", action="store_true", help="agent A always plays player1")
+    parser.add_argument("--record", default=None,
+                        help="append every game to this record file (binary for .lgr, text otherwise)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = run_selfplay(parse_agent_config(args.agent1), parse_agent_config(args.agent2), args.games,
+                           workers=args.workers, start=args.start, randomise=args.random_start,
+                           seed=args.seed, max_plies=args.max_plies, swap_sides=not args.no_swap,
+                           record_path=args.record)
+    summary = summarize(results)
+    print("A: %s  B: %s" % (args.agent1, args.agent2))
+    print("Games %d in %.1fs: A wins %d, B wins %d, draws %d" % (
+        summary["games"], time.perf_counter() - started, summary["a_wins"], summary["b_wins"], summary["draws"]))
+    if "plies_mean" in summary:
+        print("Length: mean %.1f, min %d, max %d plies" % (
+            summary["plies_mean"], summary["plies_min"], summary["plies_max"]))
+    for name in ("a", "b"):
+        if name + "_move_time_mean" in summary:
+            print("%s move time: mean %.4fs, max %.4fs" % (
+                name.upper(), summary[name + "_move_time_mean"], summary[name + "_move_time_max"]))
+
+
+if __name__ == "__main__":
+    main()
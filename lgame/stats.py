@@ -0,0 +1,94 @@
+# stats.py stores the per-move search statistics record kept by MinimaxAgent
+
+import json
+
+
+def _json_score(score):
+    # JSON has no infinity; forced wins and losses are written as strings
+    if score in (float('inf'), float('-inf')):
+        return "inf" if score > 0 else "-inf"
+    return score
+
+
+class SearchStats:
+    """
+    What one getAction call did: nodes, leaf evaluations, transposition table
+    use, beta cutoffs per ply, one record per finished iteration and the
+    principal variation and score of the deepest one
+    """
+    def __init__(self):
+        self.source = "search"
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        # Probes whose stored result was returned without searching
+        self.tt_cutoffs = 0
+        # Nodes scored as draws because their position was already on the path
+        self.repetitions = 0
+        # cutoffs[ply] counts beta cutoffs at that distance from the root
+        self.cutoffs = {}
+        self.iterations = []
+        self.completed_depth = 0
+        self.score = None
+        self.move = None
+        self.principal_variation = []
+        self.seconds = 0.0
+
+    def record_cutoff(self, ply):
+        self.cutoffs[ply] = self.cutoffs.get(ply, 0) + 1
+
+    def record_iteration(self, depth, nodes, seconds, score):
+        self.iterations.append({"depth": depth, "nodes": nodes, "seconds": seconds, "score": score})
+
+    def merge(self, other):
+        """
+        Adds the counters of a search run elsewhere, such as a root-split worker
+        """
+        self.nodes += other.nodes
+        self.leaf_evaluations += other.leaf_evaluations
+        self.tt_probes += other.tt_probes
+        self.tt_hits += other.tt_hits
+        self.tt_cutoffs += other.tt_cutoffs
+        self.repetitions += other.repetitions
+        for ply, count in other.cutoffs.items():
+            self.cutoffs[ply] = self.cutoffs.get(ply, 0) + count
+
+    def effective_branching_factor(self):
+        """
+        The b with b ** depth equal to the nodes of the deepest finished iteration
+        """
+        if not self.iterations:
+            return 0.0
+        last = self.iterations[-1]
+        return last["nodes"] ** (1.0 / last["depth"]) if last["nodes"] else 0.0
+
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def to_dict(self):
+        return {
+            "source": self.source,
+            "nodes": self.nodes,
+            "leaf_evaluations": self.leaf_evaluations,
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tt_hit_rate": self.tt_hit_rate(),
+            "tt_cutoffs": self.tt_cutoffs,
+            "repetitions": self.repetitions,
+            "cutoffs_per_ply": [self.cutoffs.get(ply, 0) for ply in range(max(self.cutoffs, default=-1) + 1)],
+            "effective_branching_factor": self.effective_branching_factor(),
+            "iterations": [dict(iteration, score=_json_score(iteration["score"])) for iteration in self.iterations],
+            "completed_depth": self.completed_depth,
+            "score": _json_score(self.score),
+            "move": self.move,
+            "principal_variation": self.principal_variation,
+            "seconds": self.seconds,
+        }
+
+    def write_json_line(self, path):
+        """
+        Appends this record to a JSON lines file
+        """
+        with open(path, "a") as f:
+            f.write(json.dumps(self.to_dict()) + "\n")
@@ -0,0 +1,99 @@
+# symmetry.py stores the 8 board symmetries (rotations and reflections) of the 4x4 board
+#
+# Every rule and the evaluation are invariant under these transforms, so
+# symmetric positions can share one entry in caches, tablebases and books.
+
+from .bitboard import BOARD_SIZE, SQUARES, Bitboard, square_index
+from .movegen import PLACEMENT_BY_MASK, PLACEMENT_BY_NOTATION
+
+LAST = BOARD_SIZE + 1
+
+# Each transform maps a square (x, y) to its image
+TRANSFORMS = (
+    lambda x, y: (x, y),                # identity
+    lambda x, y: (y, LAST - x),         # rotate 90
+    lambda x, y: (LAST - x, LAST - y),  # rotate 180
+    lambda x, y: (LAST - y, x),         # rotate 270
+    lambda x, y: (LAST - x, y),         # mirror x
+    lambda x, y: (x, LAST - y),         # mirror y
+    lambda x, y: (y, x),                # main diagonal
+    lambda x, y: (LAST - y, LAST - x),  # anti-diagonal
+)
+
+IDENTITY = 0
+INVERSE = (0, 3, 2, 1, 4, 5, 6, 7)
+
+
+def _build_byte_tables(transform):
+    """
+    Images of every low byte and high byte of a mask, so a 16-bit mask
+    transforms with two lookups
+    """
+    images = [1 << square_index(*transform(x, y)) for x, y in SQUARES]
+    low = []
+    high = []
+    for byte in range(256):
+        low_image = 0
+        high_image = 0
+        for bit in range(8):
+            if byte >> bit & 1:
+                low_image |= images[bit]
+                high_image |= images[bit + 8]
+        low.append(low_image)
+        high.append(high_image)
+    return low, high
+
+
+BYTE_TABLES = tuple(_build_byte_tables(transform) for transform in TRANSFORMS)
+
+
+def transform_mask(mask, transform):
+    low, high = BYTE_TABLES[transform]
+    return low[mask & 0xFF] | high[mask >> 8]
+
+
+def transform_board(board, transform):
+    return Bitboard(transform_mask(board.player1, transform),
+                    transform_mask(board.player2, transform),
+                    transform_mask(board.neutrals, transform),
+                    board.side)
+
+
+def canonical_board(board):
+    """
+    Returns (canonical board, transform) where the canonical board is the image
+    with the smallest key and transform maps board onto it
+    """
+    best = board
+    best_key = board.key()
+    best_transform = IDENTITY
+    for transform in range(1, len(TRANSFORMS)):
+        image = transform_board(board, transform)
+        key = image.key()
+        if key < best_key:
+            best, best_key, best_transform = image, key, transform
+    return best, best_transform
+
+
+def transform_square(pos, transform):
+    return TRANSFORMS[transform](*pos)
+
+
+def transform_move(move, transform):
+    """
+    Maps an (x, y, orientation, neutral_move) move through transform
+    """
+    x, y, orientation, neutral_move = move
+    mask = transform_mask(PLACEMENT_BY_NOTATION[(x, y, orientation)].mask, transform)
+    notation = PLACEMENT_BY_MASK[mask].notation
+    if neutral_move:
+        old_pos, new_pos = neutral_move
+        neutral_move = (transform_square(old_pos, transform), transform_square(new_pos, transform))
+    return notation + (neutral_move,)
+
+
+def untransform_move(move, transform):
+    """
+    Maps a move found on the canonical board back onto the original board
+    """
+    return transform_move(move, INVERSE[transform])
@@ -0,0 +1,267 @@
+# tablebase.py stores the retrograde-analysis solver for the whole L-game
+#
+# Positions are stored relative to the side to move: the mover's L placement,
+# the other L placement and the neutral mask. Colours do not matter to the
+# rules, so a position and its colour-swapped twin share one entry.
+#
+# On disk the table is a header followed by one byte per (mover placement,
+# other placement, neutral pair) in index order: the result in the low 2 bits
+# and the distance above them. Loading maps the file instead of reading it, so
+# every process probing the same file shares one copy in the page cache.
+#
+# Usage: python -m lgame.tablebase [output_path]
+
+import mmap
+import struct
+import sys
+import zlib
+from collections import deque
+
+from .bitboard import FULL_MASK
+from .movegen import (L_PLACEMENTS, NEUTRAL_MOVES_PER_L_MOVE, PLACEMENT_BY_MASK, l_move_count,
+                      legal_l_placements, legal_moves, split_bits)
+
+DRAW = 0
+WIN = 1
+LOSS = 2
+
+RESULT_NAMES = {DRAW: "draw", WIN: "win", LOSS: "loss"}
+
+# Byte stored for index slots where the two L pieces overlap
+INVALID = 0xFF
+
+DEFAULT_PATH = "lgame_tablebase.bin"
+
+MAGIC = b"LGTB"
+VERSION = 1
+# magic, version, entry count, CRC32 of the entries
+HEADER = struct.Struct("<4sHII")
+
+# Every mask with exactly two squares set, numbered in increasing order
+NEUTRAL_PAIRS = tuple(mask for mask in range(FULL_MASK + 1) if bin(mask).count("1") == 2)
+NEUTRAL_PAIR_INDEX = {mask: index for index, mask in enumerate(NEUTRAL_PAIRS)}
+
+TABLE_SIZE = len(L_PLACEMENTS) * len(L_PLACEMENTS) * len(NEUTRAL_PAIRS)
+
+
+def position_key(mover_mask, other_mask, neutrals):
+    """
+    Packs a mover-relative position into an int
+    """
+    return (PLACEMENT_BY_MASK[mover_mask].index
+            | PLACEMENT_BY_MASK[other_mask].index << 6
+            | neutrals << 12)
+
+
+def board_key(board):
+    return position_key(board.own(), board.opponent(), board.neutrals)
+
+
+def unpack_key(key):
+    return L_PLACEMENTS[key & 63].mask, L_PLACEMENTS[key >> 6 & 63].mask, key >> 12
+
+
+def position_index(mover_mask, other_mask, neutrals):
+    """
+    Offset of a mover-relative position in the packed table
+    """
+    return ((PLACEMENT_BY_MASK[mover_mask].index * len(L_PLACEMENTS)
+             + PLACEMENT_BY_MASK[other_mask].index) * len(NEUTRAL_PAIRS)
+            + NEUTRAL_PAIR_INDEX[neutrals])
+
+
+def pack_results(results):
+    """
+    Packs solve()'s dict into the dense table of result | distance << 2 bytes
+    """
+    table = bytearray([INVALID]) * TABLE_SIZE
+    for key, (result, distance) in results.items():
+        table[position_index(*unpack_key(key))] = result | distance << 2
+    return table
+
+
+def enumerate_positions():
+    """
+    Yields the key of every legal arrangement of the pieces. Every one of them
+    can be reached from the standard start, so this is the reachable set.
+    """
+    for mover in L_PLACEMENTS:
+        for other in L_PLACEMENTS:
+            if mover.mask & other.mask:
+                continue
+            free_bits = split_bits(~(mover.mask | other.mask) & FULL_MASK)
+            for i, first in enumerate(free_bits):
+                for second in free_bits[i + 1:]:
+                    yield mover.index | other.index << 6 | (first | second) << 12
+
+
+def count_moves(key):
+    """
+    Number of moves (L move plus optional neutral move) from key
+    """
+    mover, other, neutrals = unpack_key(key)
+    # Each L move can be followed by any neutral move or by none
+    return (NEUTRAL_MOVES_PER_L_MOVE + 1) * l_move_count(mover, other | neutrals)
+
+
+def predecessors(key):
+    """
+    Yields the keys of every position with a move leading to key. The player
+    who just moved owns the 'other' L in key and is the mover in its predecessors.
+    """
+    mover, other, neutrals = unpack_key(key)
+    other_index = PLACEMENT_BY_MASK[other].index
+    mover_index = PLACEMENT_BY_MASK[mover].index
+
+    previous_neutrals = [neutrals]
+    free_bits = split_bits(~(mover | other | neutrals) & FULL_MASK)
+    for moved_to in split_bits(neutrals):
+        for moved_from in free_bits:
+            previous_neutrals.append(neutrals ^ moved_to | moved_from)
+
+    for before in previous_neutrals:
+        for placement in legal_l_placements(other, mover | before):
+            yield placement.index | mover_index << 6 | before << 12
+
+
+def solve():
+    """
+    Runs retrograde analysis over every position and returns a dict mapping
+    position keys to (result, distance) for the side to move, where distance
+    counts plies until the game ends under optimal play
+    """
+    results = {}
+    remaining = {}
+    queue = deque()
+
+    for key in enumerate_positions():
+        moves = count_moves(key)
+        if moves == 0:
+            results[key] = (LOSS, 0)
+            queue.append(key)
+        else:
+            remaining[key] = moves
+
+    while queue:
+        key = queue.popleft()
+        result, distance = results[key]
+        for previous in predecessors(key):
+            if previous in results:
+                continue
+            if result == LOSS:
+                results[previous] = (WIN, distance + 1)
+                queue.append(previous)
+            else:
+                remaining[previous] -= 1
+                if remaining[previous] == 0:
+                    results[previous] = (LOSS, distance + 1)
+                    queue.append(previous)
+
+    for key in remaining:
+        if key not in results:
+            results[key] = (DRAW, 0)
+    return results
+
+
+class Tablebase:
+    """
+    Solved values for every position, with lookups by Bitboard. data is the
+    packed table; offset is where it starts, so an mmap of the whole file
+    can be probed in place.
+    """
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+
+    @classmethod
+    def build(cls):
+        return cls(pack_results(solve()))
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH, verify=True):
+        """
+        Maps a saved table read-only; with verify the checksum is checked once
+        """
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(data) < HEADER.size:
+            data.close()
+            raise ValueError("%s is not a tablebase file" % path)
+        magic, version, count, checksum = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or count != TABLE_SIZE:
+            data.close()
+            raise ValueError("%s is not a version %d tablebase file" % (path, VERSION))
+        if len(data) != HEADER.size + count or (verify and zlib.crc32(data[HEADER.size:]) != checksum):
+            data.close()
+            raise ValueError("%s is truncated or corrupt" % path)
+        return cls(data, HEADER.size)
+
+    def save(self, path=DEFAULT_PATH):
+        table = self.data[self.offset:self.offset + TABLE_SIZE]
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, TABLE_SIZE, zlib.crc32(table)))
+            f.write(table)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def lookup(self, mover_mask, other_mask, neutrals):
+        """
+        Returns (result, distance) for a mover-relative position
+        """
+        value = self.data[self.offset + position_index(mover_mask, other_mask, neutrals)]
+        return value & 3, value >> 2
+
+    def probe(self, board):
+        """
+        Returns (result, distance) for the side to move on board
+        """
+        return self.lookup(board.own(), board.opponent(), board.neutrals)
+
+    def counts(self):
+        """
+        Number of positions with each result, by RESULT_NAMES name
+        """
+        counts = {name: 0 for name in RESULT_NAMES.values()}
+        for value in self.data[self.offset:self.offset + TABLE_SIZE]:
+            if value != INVALID:
+                counts[RESULT_NAMES[value & 3]] += 1
+        return counts
+
+    def best_move(self, board):
+        """
+        Picks the move that wins fastest, keeps a draw, or loses slowest.
+        Returns (placement, neutral_from, neutral_to) or None when there is no move.
+        """
+        best = None
+        best_rank = None
+        for move in legal_moves(board, neutral_optional=True):
+            placement, neutral_from, neutral_to = move
+            result, distance = self.lookup(board.opponent(), placement.mask,
+                                           board.neutrals ^ neutral_from | neutral_to)
+            # Rank moves from the mover's point of view; lower is better
+            if result == LOSS:
+                rank = (0, distance)
+            elif result == DRAW:
+                rank = (1, 0)
+            else:
+                rank = (2, -distance)
+            if best_rank is None or rank < best_rank:
+                best = move
+                best_rank = rank
+        return best
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH
+    tablebase = Tablebase.build()
+    counts = tablebase.counts()
+    tablebase.save(path)
+    print("Solved %d positions: %d wins, %d losses, %d draws" % (
+        sum(counts.values()), counts["win"], counts["loss"], counts["draw"]))
+    print("Saved tablebase to %s" % path)
+
+
+if __name__ == "__main__":
+    main()
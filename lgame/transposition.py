@@ -0,0 +1,122 @@
+# transposition.py stores Zobrist hashing and the bounded transposition table used by the search
+
+import random
+
+from .bitboard import SQUARES, SQUARE_BITS
+from .movegen import L_PLACEMENTS
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+# The value came from a subtree that hit a repetition, so it depends on the path
+# to the position; only the move may be reused
+PATH_DEPENDENT = 3
+
+# Fixed seed so a position hashes the same in every run and every worker process
+_rng = random.Random(0x4C47414D)
+
+ZOBRIST_SQUARES = tuple(
+    {SQUARE_BITS[pos]: _rng.getrandbits(64) for pos in SQUARES}
+    for _ in range(3)
+)
+ZOBRIST_NEUTRAL = ZOBRIST_SQUARES[2]
+ZOBRIST_SIDE = _rng.getrandbits(64)
+ZOBRIST_MAXIMIZING = _rng.getrandbits(64)
+
+
+def _placement_keys(square_keys):
+    keys = {}
+    for placement in L_PLACEMENTS:
+        key = 0
+        for pos in placement.positions:
+            key ^= square_keys[SQUARE_BITS[pos]]
+        keys[placement.mask] = key
+    return keys
+
+
+# ZOBRIST_L[side][mask] is the combined key of an L piece, so moving it costs two xors
+ZOBRIST_L = (_placement_keys(ZOBRIST_SQUARES[0]), _placement_keys(ZOBRIST_SQUARES[1]))
+
+
+def zobrist_hash(board):
+    """
+    Computes the hash of a Bitboard from scratch
+    """
+    key = ZOBRIST_L[0][board.player1] ^ ZOBRIST_L[1][board.player2]
+    neutrals = board.neutrals
+    while neutrals:
+        bit = neutrals & -neutrals
+        key ^= ZOBRIST_NEUTRAL[bit]
+        neutrals ^= bit
+    return key ^ ZOBRIST_SIDE if board.side else key
+
+
+def zobrist_update(key, side, old_l, new_l, neutral_from=0, neutral_to=0):
+    """
+    Hash after the side to move takes its L from old_l to new_l and optionally
+    moves a neutral piece; neutral squares are single-bit masks
+    """
+    l_keys = ZOBRIST_L[side]
+    key ^= l_keys[old_l] ^ l_keys[new_l] ^ ZOBRIST_SIDE
+    if neutral_from:
+        key ^= ZOBRIST_NEUTRAL[neutral_from] ^ ZOBRIST_NEUTRAL[neutral_to]
+    return key
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results. Each slot holds one
+    (key, depth, flag, value, move, generation) entry; a colliding store
+    replaces the old entry if it came from an earlier search or was searched
+    no deeper than the new one.
+    """
+    def __init__(self, max_entries=1 << 16):
+        size = 1
+        while size < max_entries:
+            size <<= 1
+        self.size = size
+        self.index_mask = size - 1
+        self.clear()
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def new_search(self):
+        """
+        Ages existing entries so the next search prefers its own results
+        """
+        self.generation += 1
+
+    def probe(self, key):
+        """
+        Returns (depth, flag, value, move) for key, or None
+        """
+        self.probes += 1
+        entry = self.slots[key & self.index_mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1:5]
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        index = key & self.index_mask
+        entry = self.slots[index]
+        if entry is not None and entry[0] != key:
+            if entry[5] == self.generation and entry[1] > depth:
+                return
+            self.overwrites += 1
+        self.slots[index] = (key, depth, flag, value, move, self.generation)
+        self.stores += 1
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def __len__(self):
+        return sum(1 for entry in self.slots if entry is not None)
@@ -0,0 +1,69 @@
+import unittest
+
+from lgame import DEFAULT_STATE, GameState, MinimaxAgent, PVSAgent, notation_to_move, parse_game_state
+from lgame.engine import MINIMAX_DRAW_SCORE
+from lgame.movegen import has_l_move, legal_moves
+from lgame.transposition import PATH_DEPENDENT
+
+
+class MinimaxTerminalTest(unittest.TestCase):
+    """
+    Only a side to move with no L move has lost, and that loss is scored for
+    the root player whichever side it is
+    """
+    # player1 to move and able to leave player2 without an L move
+    WINS_IN_ONE = ("3 4 E 2 4 4 1 1 3 E", "3 1 W 2 2 4 1 1 4 E")
+
+    def test_wins_in_one_are_played(self):
+        for text in self.WINS_IN_ONE:
+            with self.subTest(state=text):
+                board = parse_game_state(text).toBitboard()
+                agent = MinimaxAgent(depth=3, verbose=False)
+                placement, neutral_from, neutral_to = notation_to_move(agent.getAction(parse_game_state(text)))
+                after = board.successor(placement.mask, neutral_from, neutral_to)
+                self.assertFalse(has_l_move(after.own(), after.l_blockers()))
+                self.assertEqual(agent.stats.score, float('inf'))
+
+    def test_a_stuck_opponent_is_not_a_decided_score(self):
+        # Some replies here leave the player who made them without an L move, which decides nothing
+        agent = MinimaxAgent(depth=3, verbose=False)
+        agent.getAction(parse_game_state("3 4 N 1 1 4 3 3 2 N"))
+        self.assertEqual(agent.completed_depth, 3)
+        self.assertNotIn(agent.stats.score, (float('inf'), float('-inf')))
+
+
+
+class RepetitionTest(unittest.TestCase):
+    """
+    Scores that depend on the game path must not outlive the search that found them
+    """
+    def setUp(self):
+        self.root = parse_game_state(DEFAULT_STATE).toBitboard()
+        # Positions two plies on from the root, with the root's side to move again
+        history = []
+        for placement, neutral_from, neutral_to in legal_moves(self.root)[:6]:
+            child = self.root.successor(placement.mask, neutral_from, neutral_to)
+            for reply, reply_from, reply_to in legal_moves(child)[:6]:
+                history.append(child.successor(reply.mask, reply_from, reply_to).key())
+        self.history = tuple(history)
+
+    def test_repetition_results_are_not_reused(self):
+        agent = PVSAgent(depth=4, verbose=False)
+        agent.getAction(GameState.fromBitboard(self.root, self.history))
+        self.assertGreater(agent.stats.repetitions, 0)
+        self.assertTrue(any(slot is not None and slot[2] == PATH_DEPENDENT for slot in agent.tt.slots))
+
+        move = agent.getAction(GameState.fromBitboard(self.root))
+        fresh = PVSAgent(depth=4, verbose=False)
+        self.assertEqual(fresh.getAction(GameState.fromBitboard(self.root)), move)
+        self.assertEqual(fresh.stats.score, agent.stats.score)
+
+    def test_draw_score_is_fixed(self):
+        agent = MinimaxAgent(depth=3, verbose=False)
+        for text in (DEFAULT_STATE, "3 1 W 1 1 3 4 1 2 E"):
+            agent.getAction(GameState.fromBitboard(parse_game_state(text).toBitboard(), self.history))
+            self.assertEqual(agent.draw_score, MINIMAX_DRAW_SCORE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import importlib.util
+import os
+import unittest
+from types import SimpleNamespace
+
+from lgame.history import GameHistory
+
+
+def position(ply):
+    """
+    A stand-in packed key for the position after ply moves, player1 to move on even plies
+    """
+    return ply + 1 | (ply & 1) << 48
+
+
+def played(plies, cap=100):
+    history = GameHistory(cap)
+    history.reset(position(0))
+    for ply in range(1, plies + 1):
+        history.push(position(ply))
+    return history
+
+
+class GameHistoryTest(unittest.TestCase):
+    def test_undo_and_redo(self):
+        history = played(5)
+        self.assertEqual(history.undo(2), position(3))
+        self.assertEqual((history.ply(), history.undo_count(), history.redo_count()), (3, 3, 2))
+        self.assertEqual(history.redo(), position(4))
+        self.assertEqual(history.undo(10), position(0))
+        self.assertIsNone(history.undo())
+        self.assertEqual(history.redo(10), position(5))
+        self.assertIsNone(history.redo())
+
+    def test_new_move_drops_the_redo_tail(self):
+        history = played(5)
+        history.undo(3)
+        history.push(99)
+        self.assertEqual(history.redo_count(), 0)
+        self.assertEqual(list(history.path()), [position(0), position(1), position(2), 99])
+        self.assertEqual(history.last_ply(), 3)
+
+    def test_cap_drops_the_oldest_positions(self):
+        history = played(10, cap=4)
+        self.assertEqual(len(history), 5)
+        self.assertEqual((history.first_ply, history.ply()), (6, 10))
+        # Undo stops at the oldest position kept, and plies keep counting from the game's start
+        self.assertEqual(history.undo(100), position(6))
+        self.assertEqual((history.ply(), history.undo_count(), history.redo_count()), (6, 0, 4))
+        self.assertEqual(history.redo(2), position(8))
+        with self.assertRaises(ValueError):
+            history.rewind(5)
+        # Pushing after an undo past the cap trims the redo tail, not the kept start
+        history.undo(2)
+        history.push(99)
+        self.assertEqual((history.first_ply, history.ply(), history.last_ply()), (6, 7, 7))
+        for _ in range(6):
+            history.push(99)
+        self.assertEqual((history.first_ply, history.ply(), len(history)), (9, 13, 5))
+
+    def test_repetitions_count_up_to_the_current_position(self):
+        history = GameHistory()
+        history.reset(1)
+        for key in (2, 1, 2, 1):
+            history.push(key)
+        self.assertEqual(history.repetitions(), 3)
+        history.undo(2)
+        self.assertEqual(history.repetitions(), 2)
+        self.assertEqual(history.repetitions(2), 1)
+
+
+def load_lgame():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "L-game.py")
+    spec = importlib.util.spec_from_file_location("lgame_ui", path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except ImportError as error:
+        raise unittest.SkipTest("L-game.py needs pygame: %s" % error)
+    return module.LGame
+
+
+class LGameUndoTest(unittest.TestCase):
+    """
+    Against the AI (player2), undo and redo always stop on the human's turn
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.LGame = load_lgame()
+
+    def game(self, mode, history):
+        restored = []
+        return SimpleNamespace(history=history, game_mode=mode, restored=restored, restore_position=restored.append)
+
+    def test_ai_mode_steps_over_the_ai_reply(self):
+        game = self.game("ai", played(6))
+        self.LGame.undo_last_move(game, 1)
+        self.assertEqual(game.history.ply(), 4)
+        self.LGame.undo_last_move(game, 2)
+        self.assertEqual(game.history.ply(), 2)
+        self.LGame.redo_move(game, 1)
+        self.assertEqual(game.history.ply(), 4)
+        self.LGame.redo_move(game, 5)
+        self.assertEqual(game.history.ply(), 6)
+        self.assertEqual(game.restored, [position(4), position(2), position(4), position(6)])
+
+    def test_two_player_mode_steps_one_ply(self):
+        game = self.game("human", played(6))
+        self.LGame.undo_last_move(game, 1)
+        self.assertEqual(game.history.ply(), 5)
+        self.LGame.redo_move(game, 1)
+        self.assertEqual(game.history.ply(), 6)
+
+    def test_ai_mode_after_the_cap(self):
+        # Only plies 5 to 10 are kept; ply 5 is the AI's turn, so undo stops at 6
+        game = self.game("ai", played(10, cap=5))
+        self.LGame.undo_last_move(game, 100)
+        self.assertEqual(game.history.ply(), 6)
+        self.LGame.undo_last_move(game, 1)
+        self.assertEqual(game.history.ply(), 6)
+        self.LGame.redo_move(game, 1)
+        self.assertEqual(game.history.ply(), 8)
+        self.assertEqual(game.restored, [position(6), position(8)])
+
+
+if __name__ == "__main__":
+    unittest.main()
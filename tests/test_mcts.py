@@ -0,0 +1,28 @@
+import unittest
+
+from lgame import DEFAULT_STATE, parse_game_state
+from lgame.mcts import MCTSAgent
+from lgame.search import make_agent
+
+
+class MCTSAgentTest(unittest.TestCase):
+    def test_seeded_parallel_searches_repeat(self):
+        board = parse_game_state(DEFAULT_STATE).toBitboard()
+        runs = []
+        for _ in range(2):
+            agent = MCTSAgent(workers=2, seed=7, verbose=False)
+            try:
+                runs.append(agent.searchParallel(board, 400, None))
+            finally:
+                agent.close()
+            self.assertEqual(agent.nodes_expanded, 400)
+        self.assertEqual(runs[0], runs[1])
+
+    def test_unknown_options_are_rejected(self):
+        make_agent(algorithm="mcts", depth=3, iterations=10, verbose=False)
+        with self.assertRaises(TypeError):
+            make_agent(algorithm="mcts", iteratons=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
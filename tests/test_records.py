@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+from lgame import DEFAULT_STATE, parse_game_state
+from lgame.movegen import legal_moves
+from lgame.records import GameRecord, GameRecordReader, GameRecordWriter, index_path
+
+
+def sample_game(plies, result="draw"):
+    """
+    A GameRecord of plies legal moves from the start, always the first one generated
+    """
+    start = board = parse_game_state(DEFAULT_STATE).toBitboard()
+    moves = []
+    for ply in range(plies):
+        # Alternate between L-only moves and ones that also move a neutral piece
+        move = legal_moves(board, neutral_optional=True)[ply % 2]
+        moves.append(move)
+        board = board.successor(move[0].mask, move[1], move[2])
+    return GameRecord(start, moves, result), board
+
+
+class GameRecordTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, extension):
+        return os.path.join(self.directory.name, "games" + extension)
+
+    def test_round_trip(self):
+        games = [sample_game(6, "player1")[0], sample_game(0, "*")[0], sample_game(11)[0]]
+        for extension in (".lgr", ".txt"):
+            with self.subTest(extension=extension):
+                path = self.path(extension)
+                with GameRecordWriter(path) as writer:
+                    for game in games:
+                        writer.write_game(game)
+                with GameRecordReader(path) as reader:
+                    self.assertEqual(reader.binary, extension == ".lgr")
+                    self.assertEqual(list(reader), games)
+                    self.assertEqual(reader.moves(2, 4), games[2].moves[:4])
+                    self.assertEqual(reader.position(2, 11), sample_game(11)[1])
+                    with self.assertRaises(IndexError):
+                        reader.position(2, 12)
+
+    def test_unfinished_game_is_trimmed(self):
+        for extension in (".lgr", ".txt"):
+            with self.subTest(extension=extension):
+                path = self.path(extension)
+                finished = sample_game(5)[0]
+                writer = GameRecordWriter(path)
+                writer.write_game(finished)
+                # A crash after some moves of the second game
+                writer.begin_game(finished.start)
+                for move in finished.moves[:3]:
+                    writer.write_move(move)
+                writer.close()
+                with GameRecordReader(path) as reader:
+                    self.assertEqual(list(reader), [finished])
+
+                with GameRecordWriter(path) as writer:
+                    writer.write_game(finished)
+                with GameRecordReader(path) as reader:
+                    self.assertEqual(list(reader), [finished, finished])
+
+    def test_stale_index_is_not_reused(self):
+        game = sample_game(4)[0]
+        for extension in (".lgr", ".txt"):
+            for emptied in (False, True):
+                with self.subTest(extension=extension, emptied=emptied):
+                    path = self.path(extension)
+                    with GameRecordWriter(path) as writer:
+                        for _ in range(3):
+                            writer.write_game(game)
+                    # The data file goes away but its index is left behind
+                    if emptied:
+                        open(path, "wb").close()
+                    else:
+                        os.remove(path)
+                    with GameRecordWriter(path) as writer:
+                        writer.write_game(game)
+                    self.assertEqual(os.path.getsize(index_path(path)), 8)
+                    with GameRecordReader(path) as reader:
+                        self.assertEqual(list(reader), [game])
+                    os.remove(path)
+                    os.remove(index_path(path))
+
+    def test_missing_index_is_rebuilt(self):
+        path = self.path(".lgr")
+        game = sample_game(3)[0]
+        with GameRecordWriter(path) as writer:
+            writer.write_game(game)
+        os.remove(index_path(path))
+        with GameRecordWriter(path) as writer:
+            writer.write_game(game)
+        self.assertEqual(os.path.getsize(index_path(path)), 16)
+        with GameRecordReader(path) as reader:
+            self.assertEqual(list(reader), [game, game])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+
+from lgame import (DEFAULT_STATE, MinimaxAgent, MTDfAgent, PVSAgent, SearchTimeout, legal_moves, notation_to_move,
+                   parse_game_state)
+from lgame.searchstate import SearchState
+
+
+class BudgetedSearchTest(unittest.TestCase):
+    """
+    Searches cut short by a time or node budget must still return a legal
+    move and leave no positions behind on the repetition path
+    """
+    CASES = (
+        (MinimaxAgent, {"time_limit": 0.05}),
+        (MinimaxAgent, {"node_limit": 5000}),
+        (PVSAgent, {"time_limit": 0.05}),
+        (MTDfAgent, {"node_limit": 3000}),
+        (MinimaxAgent, {"time_limit": 0.2, "workers": 2}),
+    )
+
+    def test_budgeted_searches_return_a_legal_move(self):
+        game_state = parse_game_state(DEFAULT_STATE)
+        board = game_state.toBitboard()
+        for agent_class, options in self.CASES:
+            with self.subTest(agent=agent_class.__name__, **options):
+                agent = agent_class(verbose=False, **options)
+                try:
+                    move = agent.getAction(game_state)
+                finally:
+                    agent.close()
+                self.assertIn(notation_to_move(move), legal_moves(board, neutral_optional=True))
+                self.assertEqual(agent.path_hashes, {})
+
+    def test_aborted_search_restores_the_root(self):
+        game_state = parse_game_state(DEFAULT_STATE)
+        agent = MinimaxAgent(depth=6, node_limit=2000, verbose=False)
+        agent.getAction(game_state)
+        state = SearchState(game_state.toBitboard())
+        agent.node_budget = 500
+        with self.assertRaises(SearchTimeout):
+            agent.alphabeta(state, 6, float('-inf'), float('inf'), True)
+        self.assertEqual(state.key(), game_state.toBitboard().key())
+        self.assertEqual(agent.path_hashes, {})
+
+    def test_parallel_search_keeps_its_budgets(self):
+        game_state = parse_game_state(DEFAULT_STATE)
+        agent = MinimaxAgent(depth=8, workers=2, verbose=False)
+        try:
+            for node_limit in (3000, 20000):
+                with self.subTest(node_limit=node_limit):
+                    agent.getAction(game_state, node_limit=node_limit)
+                    self.assertLessEqual(agent.nodes_expanded, node_limit)
+            stop_event = threading.Event()
+            timer = threading.Timer(0.2, stop_event.set)
+            timer.start()
+            started = time.time()
+            agent.getAction(game_state, stop_event=stop_event)
+            self.assertLess(time.time() - started, 2.0)
+            # The cancelled subtrees must not hold up the next search
+            started = time.time()
+            agent.getAction(game_state, node_limit=2000)
+            self.assertLess(time.time() - started, 2.0)
+        finally:
+            agent.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
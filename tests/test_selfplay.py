@@ -0,0 +1,40 @@
+import unittest
+from unittest import mock
+
+from lgame import DEFAULT_STATE, parse_game_state
+from lgame.movegen import PLACEMENT_BY_MASK
+from lgame.search import ALGORITHMS
+from lgame.selfplay import play_game
+
+
+class StandStillAgent:
+    """
+    Leaves its L where it is, which the rules forbid
+    """
+    def __init__(self, **options):
+        pass
+
+    def getAction(self, gameState):
+        x, y, orientation = PLACEMENT_BY_MASK[gameState.toBitboard().own()].notation
+        return x, y, orientation, None
+
+    def close(self):
+        pass
+
+
+class PlayGameTest(unittest.TestCase):
+    def setUp(self):
+        self.start = parse_game_state(DEFAULT_STATE).toBitboard().key()
+
+    def test_agents_finish_legal_games(self):
+        result = play_game(({"depth": 2}, {"algorithm": "pvs", "depth": 2}), self.start)
+        self.assertEqual(len(result["moves"]), result["plies"])
+
+    def test_an_illegal_move_is_rejected(self):
+        with mock.patch.dict(ALGORITHMS, {"stand_still": StandStillAgent}):
+            with self.assertRaisesRegex(ValueError, "stand_still.*illegal move"):
+                play_game(({"algorithm": "stand_still"}, {"depth": 2}), self.start)
+
+
+if __name__ == "__main__":
+    unittest.main()
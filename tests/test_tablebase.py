@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+from functools import lru_cache
+
+from lgame import DEFAULT_STATE, parse_game_state
+from lgame.bitboard import Bitboard
+from lgame.movegen import L_PLACEMENTS, legal_moves
+from lgame.tablebase import (DRAW, INVALID, LOSS, NEUTRAL_PAIRS, TABLE_SIZE, WIN, Tablebase, enumerate_positions,
+                             position_index, unpack_key)
+
+
+@lru_cache(maxsize=None)
+def forced_win(key, plies):
+    """
+    Whether the side to move on the Bitboard with this key can win within plies moves
+    """
+    if plies < 1:
+        return False
+    board = Bitboard.from_key(key)
+    for placement, neutral_from, neutral_to in legal_moves(board, neutral_optional=True):
+        child = board.successor(placement.mask, neutral_from, neutral_to)
+        if forced_loss(child.key(), plies - 1):
+            return True
+    return False
+
+
+@lru_cache(maxsize=None)
+def forced_loss(key, plies):
+    """
+    Whether the side to move loses within plies moves whatever it plays
+    """
+    board = Bitboard.from_key(key)
+    moves = legal_moves(board, neutral_optional=True)
+    if not moves:
+        return True
+    if plies < 2:
+        return False
+    return all(forced_win(board.successor(placement.mask, neutral_from, neutral_to).key(), plies - 1)
+               for placement, neutral_from, neutral_to in moves)
+
+
+def key_board(key):
+    mover, other, neutrals = unpack_key(key)
+    return Bitboard(mover, other, neutrals, 0)
+
+
+class TablebaseTest(unittest.TestCase):
+    """
+    The solved table is the ground truth heuristics are checked against, so it
+    is checked here against the known figures and a brute-force search
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.tablebase = Tablebase.build()
+        cls.results = {key: cls.tablebase.probe(key_board(key)) for key in enumerate_positions()}
+
+    def test_position_count_and_longest_win(self):
+        # 18,368 arrangements, 15 lost ones up to symmetry, and no win takes more than 9 plies
+        self.assertEqual(len(self.results), 18368)
+        self.assertEqual(sum(self.tablebase.counts().values()), 18368)
+        self.assertEqual(sum(1 for result in self.results.values() if result == (LOSS, 0)), 15 * 8)
+        self.assertEqual(max(distance for _, distance in self.results.values()), 9)
+
+    def test_overlapping_slots_are_invalid(self):
+        table = self.tablebase.data
+        self.assertEqual(table.count(INVALID), TABLE_SIZE - 18368)
+        for placement in L_PLACEMENTS[:4]:
+            self.assertEqual(table[position_index(placement.mask, placement.mask, NEUTRAL_PAIRS[0])], INVALID)
+
+    def test_results_match_a_brute_force_search(self):
+        # A few positions of every result and distance the brute force can reach
+        checked = {}
+        for key, (result, distance) in self.results.items():
+            if checked.get((result, distance), 0) >= 3 or distance > 4:
+                continue
+            board_key = key_board(key).key()
+            with self.subTest(key=key, result=result, distance=distance):
+                if result == WIN:
+                    self.assertTrue(forced_win(board_key, distance))
+                    self.assertFalse(forced_win(board_key, distance - 2))
+                elif result == LOSS:
+                    self.assertTrue(forced_loss(board_key, distance))
+                    self.assertFalse(distance >= 2 and forced_loss(board_key, distance - 2))
+                else:
+                    self.assertFalse(forced_win(board_key, 5))
+                    self.assertFalse(forced_loss(board_key, 4))
+            checked[result, distance] = checked.get((result, distance), 0) + 1
+        self.assertEqual(sorted(checked), [(DRAW, 0), (WIN, 1), (WIN, 3), (LOSS, 0), (LOSS, 2), (LOSS, 4)])
+
+    def test_start_is_a_draw(self):
+        self.assertEqual(self.tablebase.probe(parse_game_state(DEFAULT_STATE).toBitboard()), (DRAW, 0))
+
+    def test_best_move_keeps_the_result(self):
+        for key, (result, distance) in list(self.results.items())[::7]:
+            board = key_board(key)
+            move = self.tablebase.best_move(board)
+            if result == LOSS and distance == 0:
+                self.assertIsNone(move)
+                continue
+            placement, neutral_from, neutral_to = move
+            after = self.tablebase.probe(board.successor(placement.mask, neutral_from, neutral_to))
+            with self.subTest(key=key):
+                if result == WIN:
+                    self.assertEqual(after, (LOSS, distance - 1))
+                elif result == DRAW:
+                    self.assertEqual(after[0], DRAW)
+                else:
+                    self.assertEqual(after, (WIN, distance - 1))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.bin")
+            self.tablebase.save(path)
+            loaded = Tablebase.load(path)
+            try:
+                self.assertEqual(loaded.counts(), self.tablebase.counts())
+            finally:
+                loaded.close()
+            with open(path, "r+b") as f:
+                f.seek(-1, os.SEEK_END)
+                last = f.read(1)[0]
+                f.seek(-1, os.SEEK_END)
+                f.write(bytes([last ^ 1]))
+            with self.assertRaises(ValueError):
+                Tablebase.load(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
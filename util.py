@@ -2,6 +2,12 @@
 
 import sys
 import heapq
+import inspect
+
+def raiseNotDefined():
+    caller = inspect.stack()[1]
+    print("*** Method not implemented: %s at line %s of %s" % (caller[3], caller[2], caller[1]))
+    sys.exit(1)
 
 class Stack:
     def __init__(self):